@@ -1,10 +1,27 @@
+import hashlib
+import json
+import math
 import os
-from copy import deepcopy
+import pickle
+import re
+import sys
+import tempfile
+import weakref
+from collections import ChainMap, OrderedDict, namedtuple
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy, deepcopy
 from datetime import datetime
+from functools import partial
+from itertools import islice
+import multiprocessing
+from multiprocessing import shared_memory
+from types import MappingProxyType
 
 import numpy as np
 import openpyxl
 import pandas as pd
+import scipy.sparse
 import xlwt
 import matplotlib.pyplot as plt
 import logging as log
@@ -12,6 +29,127 @@ import logging as log
 from odym.modules import ODYM_Classes as msc
 from odym.modules import ODYM_Functions as msf
 
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+PARAMETER_CACHE_VERSION = 2
+SHARED_PARAMETER_BLOCKS = []
+SCENARIO_WORKER_STATE = {}
+EINSUM_CONTRACTION_PATHS = {}
+EINSUM_PLAIN_LOOP = {'enabled': False}
+ELEMENTWISE_BACKEND = {'name': 'numpy'}
+SCENARIO_NAMES = ['reference', 'timber_construction', 'reduced_space', 'reduced_overspec', 'cult_herit', 'renovation',
+                  'reuse_elements', 'reuse_steel', 'rec_cement', 'bundle_lifestyle', 'bundle_construction',
+                  'bundle_midway']
+SCENARIO_DEFINITIONS = {
+    'reference': {'buildings': '', 'mi': '', 'building_types': True},
+    'timber_construction': {'buildings': '', 'mi': '_timber'},
+    'reduced_space': {'buildings': '_reduced', 'mi': ''},
+    'reduced_overspec': {'buildings': '', 'mi': '_overspec'},
+    'cult_herit': {'buildings': '_cult', 'mi': ''},
+    'renovation': {'buildings': '_renov', 'mi': ''},
+    'reuse_elements': {'buildings': '', 'mi': '', 'element_reuse': ''},
+    'reuse_steel': {'buildings': '', 'mi': '', 'steel_reuse': ''},
+    'rec_cement': {'buildings': '', 'mi': '', 'cement_recycling': ''},
+    'bundle_lifestyle': {'buildings': '_lifestyle', 'mi': '_lifestyle'},
+    'bundle_construction': {'buildings': '', 'mi': '_construction', 'element_reuse': '', 'steel_reuse': '',
+                            'cement_recycling': '', 'reduce_outflow': True},
+    'bundle_midway': {'buildings': '_midway', 'mi': '_midway', 'element_reuse': '_midway', 'steel_reuse': '_midway',
+                      'cement_recycling': '_midway', 'reduce_outflow': True}}
+FLOW_GRAPH = {
+    'Construction of buildings': {'parameter': 'par_building_inflow', 'mechanism': 'buildings'},
+    'Building stock': {'parameter': 'par_building_stock', 'mechanism': 'buildings'},
+    'Demolition of buildings': {'parameter': 'par_building_outflow', 'mechanism': 'buildings'},
+    'par_mi_steel': {'parameter': 'par_mi_steel', 'mechanism': 'mi'},
+    'par_mi_concrete': {'parameter': 'par_mi_concrete', 'mechanism': 'mi'},
+    'par_steel_process': {'parameter': 'par_steel_process'},
+    'par_finished_losses': {'parameter': 'par_finished_losses'},
+    'par_steel_recycling': {'parameter': 'par_steel_recycling'},
+    'par_steel_losses': {'parameter': 'par_steel_losses'},
+    'par_cement_process': {'parameter': 'par_cement_process'},
+    'par_concrete_losses': {'parameter': 'par_concrete_losses'},
+    'par_clinker_process': {'parameter': 'par_clinker_process'},
+    'par_cement_losses': {'parameter': 'par_cement_losses'},
+    'par_concrete_reuse': {'parameter': 'par_concrete_reuse'},
+    'par_steel_element_reuse': {'parameter': 'par_steel_element_reuse', 'mechanism': 'element_reuse'},
+    'par_concrete_element_reuse': {'parameter': 'par_concrete_element_reuse', 'mechanism': 'element_reuse'},
+    'par_steel_reuse': {'parameter': 'par_steel_reuse', 'mechanism': 'steel_reuse'},
+    'par_cement_recycling': {'parameter': 'par_cement_recycling', 'mechanism': 'cement_recycling'},
+    'Building stock change': {'terms': [(1, None, 'Construction of buildings', None),
+                                        (1, None, 'Demolition of buildings', None)]},
+    'Steel inflow, new material': {'material': 0, 'inputs': ['par_mi_steel', 'par_mi_concrete',
+                                                             'Construction of buildings']},
+    'Steel stock in buildings': {'material': 0, 'inputs': ['par_mi_steel', 'par_mi_concrete', 'Building stock']},
+    'Steel outflow, demolition': {'material': 0, 'inputs': ['par_mi_steel', 'par_mi_concrete',
+                                                            'Demolition of buildings']},
+    'Concrete inflow, new material': {'material': 1, 'inputs': ['par_mi_steel', 'par_mi_concrete',
+                                                                'Construction of buildings']},
+    'Concrete stock in buildings': {'material': 1, 'inputs': ['par_mi_steel', 'par_mi_concrete', 'Building stock']},
+    'Concrete outflow, demolition': {'material': 1, 'inputs': ['par_mi_steel', 'par_mi_concrete',
+                                                               'Demolition of buildings']},
+    'Steel intensity, building types': {'subscripts': '...rbaf->...rba', 'condition': 'building_types',
+                                        'inputs': ['par_mi_steel']},
+    'Steel inflow, building types by region': {'subscripts': '...rba, ...rbat ->...rbt',
+                                               'inputs': ['Steel intensity, building types',
+                                                          'Construction of buildings']},
+    'Steel inflow, building types': {'subscripts': '...rbt->...bt',
+                                     'inputs': ['Steel inflow, building types by region']},
+    'Concrete intensity, building types': {'subscripts': '...rbao->...rba', 'condition': 'building_types',
+                                           'inputs': ['par_mi_concrete']},
+    'Concrete inflow, building types by region': {'subscripts': '...rba, ...rbat ->...rbt',
+                                                  'inputs': ['Concrete intensity, building types',
+                                                             'Construction of buildings']},
+    'Concrete inflow, building types': {'subscripts': '...rbt->...bt',
+                                        'inputs': ['Concrete inflow, building types by region']},
+    'Reuse of steel element': {'subscripts': '...rft, ...rft ->...rft',
+                               'inputs': ['par_steel_element_reuse', 'Steel outflow, demolition']},
+    'Steel outflow': {'terms': [(1, None, 'Steel outflow, demolition', None),
+                                (-1, None, 'Reuse of steel element', 'reduce_outflow')]},
+    'Reuse of steel': {'subscripts': '...rft, ...rft ->...rft', 'inputs': ['par_steel_reuse', 'Steel outflow']},
+    'Steel inflow': {'terms': [(1, None, 'Steel inflow, new material', None),
+                               (1, None, 'Reuse of steel element', None),
+                               (1, None, 'Reuse of steel', None)]},
+    'Steel production': {'subscripts': '...rfst, ...rft, ...rft ->...rst',
+                         'inputs': ['par_steel_process', 'par_finished_losses', 'Steel inflow']},
+    'Scrap recycling': {'subscripts': '...rst, ...rst, ...rst ->...rst',
+                        'inputs': ['par_steel_recycling', 'Steel production', 'par_steel_losses']},
+    'Scrap other use': {'terms': [(1, '...rft->...rt', 'Steel outflow', None),
+                                  (-1, '...rft->...rt', 'Reuse of steel element', None),
+                                  (-1, '...rft->...rt', 'Reuse of steel', None),
+                                  (-1, '...rst->...rt', 'Scrap recycling', None),
+                                  (1, '...rst->...rt', 'Steel production', None),
+                                  (-1, '...rft->...rt', 'Steel inflow', None)]},
+    'Reuse of concrete element': {'subscripts': '...rot, ...rot ->...rot',
+                                  'inputs': ['par_concrete_element_reuse', 'Concrete outflow, demolition']},
+    'Concrete inflow': {'terms': [(1, None, 'Concrete inflow, new material', None),
+                                  (1, None, 'Reuse of concrete element', None)]},
+    'Concrete outflow': {'terms': [(1, None, 'Concrete outflow, demolition', None),
+                                   (-1, None, 'Reuse of concrete element', 'reduce_outflow')]},
+    'Cement production, new material': {'subscripts': '...romt, ...rot, ...rot ->...rmt',
+                                        'inputs': ['par_cement_process', 'par_concrete_losses', 'Concrete inflow']},
+    'Concrete reuse': {'subscripts': '...rot, ...rot, ...rot ->...rot',
+                       'inputs': ['par_concrete_reuse', 'par_concrete_losses', 'Concrete inflow']},
+    'Concrete waste': {'terms': [(1, None, 'Concrete outflow', None), (1, None, 'Concrete reuse', None)]},
+    'Cement recycling': {'subscripts': '...romt, ...rot, ...rot, ...rot ->...rmt',
+                         'inputs': ['par_cement_process', 'par_cement_recycling', 'par_concrete_losses',
+                                    'Concrete waste']},
+    'Concrete recycled': {'subscripts': '...rot, ...rot ->...rt', 'inputs': ['par_cement_recycling', 'Concrete waste']},
+    'Cement production': {'terms': [(1, None, 'Cement production, new material', None),
+                                    (1, None, 'Cement recycling', None)]},
+    'Clinker production': {'subscripts': '...rmlt, ...rmt, ...rmt ->...rlt',
+                           'inputs': ['par_clinker_process', 'par_cement_losses', 'Cement production']},
+    'Concrete landfill': {'terms': [(1, '...rot->...rt', 'Concrete outflow', None),
+                                    (1, '...rot->...rt', 'Reuse of concrete element', None),
+                                    (1, '...rot->...rt', 'Concrete reuse', None),
+                                    (-1, None, 'Concrete recycled', None)]}}
+
 
 def main():
     data_path = add_docs_path()
@@ -22,19 +160,47 @@ def main():
 
     model_configsheet, script_config = read_parameters_from_config(data_path, mylog)
 
+    limit_blas_threads(script_config, mylog)
+
     it_aspects, it_description, it_dimension, it_index_letter, model_classification, pl_index_layer, pl_index_match, \
         pl_index_structure, pl_names, pl_version, pr_l_name, pr_l_number, master_classification, script_config = \
         read_parameters_from_classification(data_path, model_configsheet, mylog, script_config)
 
+    read_config_overrides(script_config, mylog)
+
     model_time_end, model_time_start = define_model_time(model_classification, mylog)
 
     index_table, index_table_classification_names = define_index_table(it_aspects, it_description, it_dimension,
                                                                        it_index_letter, model_classification, mylog)
 
+    convert_format = read_config_option(script_config, 'Convert_Parameter_Files', None)
+    if convert_format is not None:
+        convert_parameter_files(data_path, index_table, index_table_classification_names, master_classification,
+                                mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names, pl_version,
+                                script_config, convert_format)
+
+    region_shards = int(read_config_option(script_config, 'Region_Shards', 1))
+    if region_shards > 1:
+        return sharded_scenario_calculation(data_path, results_path, index_table, index_table_classification_names,
+                                            master_classification, mylog, pl_index_layer, pl_index_match,
+                                            pl_index_structure, pl_names, pl_version, pr_l_name, pr_l_number,
+                                            model_time_end, model_time_start, script_config, region_shards)
+
+    region_chunk_memory = read_config_option(script_config, 'Region_Chunk_Memory', None)
+    if region_chunk_memory is not None:
+        return streaming_scenario_calculation(data_path, results_path, index_table, index_table_classification_names,
+                                              master_classification, mylog, pl_index_layer, pl_index_match,
+                                              pl_index_structure, pl_names, pl_version, model_time_end,
+                                              model_time_start, script_config, float(region_chunk_memory) * 1024 ** 2)
+
     parameter_dict = read_data_and_parameters(data_path, index_table, index_table_classification_names,
                                               master_classification, mylog, pl_index_layer, pl_index_match,
                                               pl_index_structure, pl_names, pl_version, script_config)
 
+    stock_model = read_stock_model(script_config, mylog)
+    if stock_model != 'exogenous':
+        solve_dynamic_building_stock(parameter_dict, index_table, model_time_start, script_config, stock_model, mylog)
+
     building_mfa_system = define_mfa_system(index_table, model_time_end, model_time_start, parameter_dict, mylog)
 
     add_processes_mfa(building_mfa_system, pr_l_name, pr_l_number, mylog)
@@ -43,17 +209,68 @@ def main():
 
     add_stocks_mfa(building_mfa_system, mylog)
 
-    building_mfa_system.Initialize_FlowValues()
+    model_dtype = read_model_precision(script_config, mylog)
+
+    lazy_values = read_config_flag(script_config, 'Lazy_Flow_Values', False)
+    if lazy_values:
+        mylog.info('Flow and stock values are allocated when they are first assigned')
+
+    initialize_flow_values(building_mfa_system, model_dtype, lazy_values)
 
-    building_mfa_system.Initialize_StockValues()
+    initialize_stock_values(building_mfa_system, model_dtype, lazy_values)
 
     building_mfa_system.Consistency_Check()
 
-    reference_calculation(building_mfa_system, results_path, mylog)
+    scenario_selection = read_scenario_selection(script_config, mylog)
+
+    configure_flow_cache(script_config, mylog)
+
+    configure_elementwise_backend(script_config, mylog)
 
-    ce_action_calculation(building_mfa_system, results_path, mylog)
+    configure_flow_buffer_arena(script_config, mylog)
 
-    ce_bundle_calculation(building_mfa_system, results_path, mylog)
+    configure_incremental_recompute(script_config, mylog)
+
+    scenario_workers = read_scenario_workers(script_config, building_mfa_system, scenario_selection, mylog)
+
+    if read_config_flag(script_config, 'Batched_Scenarios', False):
+        batched_scenario_calculation(building_mfa_system, results_path, mylog, scenario_selection)
+    elif scenario_workers > 1:
+        parallel_scenario_calculation(building_mfa_system, results_path, mylog, scenario_selection, scenario_workers)
+    else:
+        if 'reference' in scenario_selection:
+            reference_calculation(building_mfa_system, results_path, mylog)
+
+        ce_action_calculation(building_mfa_system, results_path, mylog, scenario_selection)
+
+        ce_bundle_calculation(building_mfa_system, results_path, mylog, scenario_selection)
+
+    monte_carlo_samples = int(read_config_option(script_config, 'Monte_Carlo_Samples', 0))
+    if monte_carlo_samples > 0:
+        monte_carlo_calculation(building_mfa_system, results_path, mylog, scenario_selection, script_config,
+                                monte_carlo_samples)
+
+    sensitivity_method = str(read_config_option(script_config, 'Sensitivity_Method', 'none')).strip().lower()
+    if sensitivity_method != 'none':
+        sensitivity_calculation(building_mfa_system, results_path, mylog, scenario_selection, script_config,
+                                sensitivity_method)
+
+    mylog.info('Flow cache: ' + str(FLOW_CACHE.hits) + ' hits, ' + str(FLOW_CACHE.misses) + ' misses')
+
+    mylog.info('Flow graph: ' + str(FLOW_GRAPH_VALUES.evaluated) + ' nodes evaluated, ' +
+               str(FLOW_GRAPH_VALUES.reused) + ' nodes reused')
+
+    if FLOW_BUFFER_ARENA.enabled:
+        mylog.info('Flow buffer arena: ' + str(FLOW_BUFFER_ARENA.allocated) + ' buffers allocated, ' +
+                   str(FLOW_BUFFER_ARENA.reused) + ' buffers reused')
+
+    if model_dtype != np.float64 and read_config_flag(script_config, 'Precision_Report', False):
+        write_precision_report(building_mfa_system, data_path, results_path, index_table,
+                               index_table_classification_names, master_classification, mylog, pl_index_layer,
+                               pl_index_match, pl_index_structure, pl_names, pl_version, pr_l_name, pr_l_number,
+                               model_time_end, model_time_start, script_config, scenario_selection)
+
+    return building_mfa_system
 
 
 def add_docs_path():
@@ -65,7 +282,7 @@ def add_results_path():
     folder_path = os.path.join(os.getcwd(), '../..', 'buildings_pro_stock_EU/results/')
     today = datetime.today().strftime('%Y-%m-%d')
     results_path = folder_path + 'results_' + today + '/'
-    os.mkdir(results_path)
+    os.makedirs(results_path, exist_ok=True)
     return results_path
 
 
@@ -80,9 +297,10 @@ def initialize_logging():
 def read_parameters_from_config(data_path, mylog):
     mylog.info('Read and parse config table, including the model index table, from model config sheet.')
     project_specs_name_con_file = 'config_stock_model.xlsx'
-    model_configfile = openpyxl.load_workbook(os.path.join(data_path, project_specs_name_con_file), data_only=True)
+    model_configfile = WorkbookValues(os.path.join(data_path, project_specs_name_con_file))
     script_config = {'Model Setting': model_configfile['Config'].cell(4, 4).value}
     model_configsheet = model_configfile[script_config['Model Setting']]
+    model_configfile.close()
     name_scenario = model_configsheet.cell(4, 4).value
     print(name_scenario)
     script_config = msf.ParseModelControl(model_configsheet, script_config)
@@ -94,8 +312,9 @@ def read_parameters_from_classification(data_path, model_configsheet, mylog, scr
     mylog.info('Define model classifications and select items for model classifications according to information '
                'provided by classification file')
     project_specs_name_classfile = 'classifications_stock_model.xlsx'
-    classfile = openpyxl.load_workbook(os.path.join(data_path, project_specs_name_classfile), data_only=True)
+    classfile = WorkbookValues(os.path.join(data_path, project_specs_name_classfile))
     classsheet = classfile['MAIN_Table']
+    classfile.close()
     master_classification = msf.ParseClassificationFile_Main(classsheet, mylog)
     print('Read index table from model config sheet.')
     it_aspects, it_description, it_dimension, it_classification, it_selector, it_index_letter, pl_names, \
@@ -151,30 +370,1013 @@ def define_index_table(it_aspects, it_description, it_dimension, it_index_letter
 
 def read_data_and_parameters(data_path, index_table, index_table_classification_names, master_classification,
                              mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names, pl_version,
-                             script_config):
+                             script_config, region_bounds=None):
     print('Read model data and parameters.')
+    cache_path = define_parameter_cache_path(data_path, script_config, mylog)
+    sparse_names = read_sparse_parameter_names(script_config, pl_names, pl_index_structure, mylog)
+    model_dtype = read_model_precision(script_config, mylog)
+    if read_config_flag(script_config, 'Lazy_Parameter_Loading', False):
+        mylog.info('Parameters are read on first access')
+        index_sizes = region_index_sizes(index_table, region_bounds)
+        parameter_readers = {}
+        parameter_bytes = {}
+        for mo in range(0, len(pl_names)):
+            parameter_bytes[pl_names[mo]] = int(np.prod([int(index_sizes[index_letter]) for index_letter in
+                                                         pl_index_structure[mo]])) * np.dtype(model_dtype).itemsize
+            parameter_readers[pl_names[mo]] = \
+                partial(read_parameter_object, os.path.join(data_path, pl_version[mo]), pl_names[mo],
+                        pl_index_structure[mo], pl_index_match[mo], pl_index_layer[mo], master_classification,
+                        index_table, index_table_classification_names, script_config, cache_path, mylog,
+                        pl_names[mo] in sparse_names, model_dtype, region_bounds)
+        return LazyParameterDict(parameter_readers, parameter_bytes)
+    read_workers = int(read_config_option(script_config, 'Parameter_Read_Workers', 1))
+    if read_workers > 1:
+        parameters = read_parameters_parallel(data_path, index_table, index_table_classification_names,
+                                              master_classification, mylog, pl_index_layer, pl_index_match,
+                                              pl_index_structure, pl_names, pl_version, script_config, cache_path,
+                                              read_workers, region_bounds)
+    else:
+        parameters = []
+        for mo in range(0, len(pl_names)):
+            par_path = os.path.join(data_path, pl_version[mo])
+            print('Reading parameter ' + pl_names[mo])
+            mylog.info('Reading parameter' + pl_names[mo])
+            parameters.append(read_parameter(par_path, pl_names[mo], pl_index_structure[mo], pl_index_match[mo],
+                                             pl_index_layer[mo], master_classification, index_table,
+                                             index_table_classification_names, script_config, cache_path, mylog,
+                                             region_bounds))
     parameter_dict = {}
     for mo in range(0, len(pl_names)):
-        par_path = os.path.join(data_path, pl_version[mo])
-        print('Reading parameter ' + pl_names[mo])
-        mylog.info('Reading parameter' + pl_names[mo])
-        meta_data, values = msf.ReadParameterXLSX(par_path, pl_names[mo], pl_index_structure[mo],
-                                                  pl_index_match[mo], pl_index_layer[mo],
-                                                  master_classification, index_table,
-                                                  index_table_classification_names, script_config, mylog, False)
-        parameter_dict[pl_names[mo]] = msc.Parameter(Name=meta_data['Dataset_Name'],
-                                                     ID=meta_data['Dataset_ID'],
-                                                     UUID=meta_data['Dataset_UUID'],
-                                                     P_Res=None,
-                                                     MetaData=meta_data,
-                                                     Indices=pl_index_structure[mo],
-                                                     Values=values,
-                                                     Uncert=None,
-                                                     Unit=meta_data['Dataset_Unit'])
+        meta_data, values = parameters[mo]
+        parameter_dict[pl_names[mo]] = define_parameter(meta_data, values, pl_index_structure[mo],
+                                                        pl_names[mo] in sparse_names, model_dtype)
     mylog.info('Reading of parameters finished')
     return parameter_dict
 
 
+def region_index_sizes(index_table, region_bounds):
+    if region_bounds is not None:
+        index_table = region_shard_index_table(index_table, region_bounds[0], region_bounds[1])
+    return index_table.set_index('IndexLetter')['IndexSize']
+
+
+def define_parameter(meta_data, values, par_index_structure, sparse=False, dtype=np.float64):
+    values = values.astype(dtype, copy=False)
+    if sparse:
+        values = sparse_values(values)
+    return msc.Parameter(Name=meta_data['Dataset_Name'],
+                         ID=meta_data['Dataset_ID'],
+                         UUID=meta_data['Dataset_UUID'],
+                         P_Res=None,
+                         MetaData=meta_data,
+                         Indices=par_index_structure,
+                         Values=values,
+                         Uncert=parameter_uncertainty_spec(meta_data),
+                         Unit=meta_data['Dataset_Unit'])
+
+
+def parameter_uncertainty_spec(meta_data):
+    uncertainty_spec = meta_data.get('Dataset_Uncertainty_Global')
+    if uncertainty_spec is None or str(uncertainty_spec).strip().lower() in ('', 'none'):
+        return None
+    return str(uncertainty_spec)
+
+
+def read_parameter_object(par_path, par_name, par_index_structure, par_index_match, par_index_layer,
+                          master_classification, index_table, index_table_classification_names, script_config,
+                          cache_path, mylog, sparse=False, dtype=np.float64, region_bounds=None):
+    print('Reading parameter ' + par_name)
+    mylog.info('Reading parameter' + par_name)
+    meta_data, values = read_parameter(par_path, par_name, par_index_structure, par_index_match, par_index_layer,
+                                       master_classification, index_table, index_table_classification_names,
+                                       script_config, cache_path, mylog, region_bounds)
+    return define_parameter(meta_data, values, par_index_structure, sparse, dtype)
+
+
+def read_sparse_parameter_names(script_config, pl_names, pl_index_structure, mylog):
+    sparse_option = read_config_option(script_config, 'Sparse_Parameters', None)
+    if sparse_option is None or str(sparse_option).lower() == 'false':
+        return []
+    if str(sparse_option).lower() == 'true':
+        sparse_names = [pl_names[mo] for mo in range(0, len(pl_names)) if pl_index_structure[mo].startswith('rba')]
+    else:
+        sparse_names = [name.strip() for name in str(sparse_option).split(',') if name.strip() != '']
+    for sparse_name in sparse_names:
+        if sparse_name not in pl_names:
+            mylog.error('SPARSE PARAMETER ERROR: Unknown parameter ' + sparse_name)
+    mylog.info('Parameters stored as sparse arrays: ' + ', '.join(sparse_names))
+    return sparse_names
+
+
+class SparseValues:
+    def __init__(self, coords, data, shape):
+        self.coords = coords
+        self.data = data
+        self.shape = tuple(shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.coords.nbytes + self.data.nbytes
+
+    def todense(self):
+        values = np.zeros(self.shape, dtype=self.data.dtype)
+        values[tuple(self.coords)] = self.data
+        return values
+
+
+def sparse_values(values):
+    if isinstance(values, SparseValues):
+        return values
+    coords = np.array(np.nonzero(values), dtype=np.intp)
+    return SparseValues(coords, values[tuple(coords)], values.shape)
+
+
+def dense_values(values):
+    if isinstance(values, SparseValues):
+        return values.todense()
+    return values
+
+
+def mfa_einsum(subscripts, *operands):
+    return cached_flow(subscripts, operands, partial(calculate_einsum, subscripts, *operands))
+
+
+def calculate_einsum(subscripts, *operands):
+    if not any(isinstance(operand, SparseValues) for operand in operands):
+        return np.einsum(subscripts, *operands, optimize=einsum_contraction_path(subscripts, operands))
+    input_subscripts, output_subscripts = subscripts.replace(' ', '').split('->')
+    input_subscripts = input_subscripts.split(',')
+    if '...' in subscripts:
+        if any(operand.ndim != len(subs.replace('...', '')) for operand, subs in zip(operands, input_subscripts)):
+            return np.einsum(subscripts, *[dense_values(operand) for operand in operands])
+        input_subscripts = [subs.replace('...', '') for subs in input_subscripts]
+        output_subscripts = output_subscripts.replace('...', '')
+    if len(operands) == 1 and len(output_subscripts) > 0:
+        return sparse_reduction(input_subscripts[0], operands[0], output_subscripts)
+    if len(operands) != 2:
+        return np.einsum(subscripts, *[dense_values(operand) for operand in operands])
+    sparse_operands = [op for op in range(0, len(operands)) if isinstance(operands[op], SparseValues)]
+    sp = max(sparse_operands, key=lambda op: operands[op].data.size)
+    de = 1 - sp
+    return sparse_einsum(input_subscripts[sp], operands[sp], input_subscripts[de], dense_values(operands[de]),
+                         output_subscripts)
+
+
+def material_intensity_flows(par_mi_steel, par_mi_concrete, building_values):
+    mi_materials = cached_flow('rbaf, rbao ->rbam', (par_mi_steel, par_mi_concrete),
+                               partial(concatenate_material_intensities, par_mi_steel, par_mi_concrete))
+    return cached_flow('rbam, rbat ->rmt', (mi_materials, building_values),
+                       partial(material_intensity_product, mi_materials, building_values, par_mi_steel.shape[-1]))
+
+
+def concatenate_material_intensities(par_mi_steel, par_mi_concrete):
+    mi_steel = dense_values(par_mi_steel)
+    mi_concrete = dense_values(par_mi_concrete)
+    mi_shape = np.broadcast_shapes(mi_steel.shape[:-1], mi_concrete.shape[:-1])
+    return np.concatenate((np.broadcast_to(mi_steel, mi_shape + mi_steel.shape[-1:]),
+                           np.broadcast_to(mi_concrete, mi_shape + mi_concrete.shape[-1:])), axis=-1)
+
+
+def material_intensity_product(mi_materials, building_values, steel_items):
+    if isinstance(building_values, SparseValues) and mi_materials.ndim == 4:
+        material_values = calculate_einsum('rbam, rbat ->rmt', mi_materials, building_values)
+    else:
+        building_values = dense_values(building_values)
+        cohort_items = mi_materials.shape[-3] * mi_materials.shape[-2]
+        material_values = np.matmul(
+            mi_materials.reshape(mi_materials.shape[:-3] + (cohort_items, mi_materials.shape[-1])).swapaxes(-1, -2),
+            building_values.reshape(building_values.shape[:-3] + (cohort_items, building_values.shape[-1])))
+    return material_values[..., :steel_items, :], material_values[..., steel_items:, :]
+
+
+def cached_flow(operation, operands, calculate_flow):
+    if not FLOW_CACHE.enabled or FLOW_BUFFER_ARENA.holds(operands):
+        return calculate_flow()
+    flow_key = (operation,) + tuple(id(operand) for operand in operands)
+    flow_values = FLOW_CACHE.get(flow_key)
+    if flow_values is None:
+        flow_values = calculate_flow()
+        for flow_array in flow_values if isinstance(flow_values, tuple) else (flow_values,):
+            flow_array.flags.writeable = False
+        FLOW_CACHE.put(flow_key, operands, flow_values)
+    return flow_values
+
+
+class FlowCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, flow_key):
+        if flow_key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(flow_key)
+        return self.entries[flow_key][1]
+
+    def put(self, flow_key, operands, flow_values):
+        flow_bytes = sum(flow_array.nbytes for flow_array in
+                         (flow_values if isinstance(flow_values, tuple) else (flow_values,)))
+        if flow_bytes > self.max_bytes:
+            return
+        operand_refs = tuple(weakref.ref(operand, partial(self.evict, flow_key)) for operand in operands)
+        self.evict(flow_key)
+        self.entries[flow_key] = (operand_refs, flow_values, flow_bytes)
+        self.nbytes += flow_bytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self.entries.popitem(last=False)[1][2]
+
+    def evict(self, flow_key, operand_ref=None):
+        if flow_key in self.entries and (operand_ref is None or operand_ref in self.entries[flow_key][0]):
+            self.nbytes -= self.entries.pop(flow_key)[2]
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+
+FLOW_CACHE = FlowCache(1024 ** 3)
+
+
+def configure_flow_cache(script_config, mylog):
+    FLOW_CACHE.clear()
+    FLOW_CACHE.max_bytes = int(float(read_config_option(script_config, 'Flow_Cache_Size', 1024)) * 1024 ** 2)
+    mylog.info('Flow cache size: ' + str(FLOW_CACHE.max_bytes // 1024 ** 2) + ' MB')
+
+
+class FlowBufferArena:
+    def __init__(self):
+        self.enabled = False
+        self.buffers = {}
+        self.buffer_ids = set()
+        self.generations = {}
+        self.allocated = 0
+        self.reused = 0
+
+    def buffer(self, node, shape, dtype):
+        buffer_key = (node, tuple(shape), np.dtype(dtype))
+        if buffer_key in self.buffers:
+            self.reused += 1
+        else:
+            self.buffers[buffer_key] = np.empty(shape, dtype=dtype)
+            self.buffer_ids.add(id(self.buffers[buffer_key]))
+            self.allocated += 1
+        self.generations[id(self.buffers[buffer_key])] = self.generations.get(id(self.buffers[buffer_key]), 0) + 1
+        self.buffers[buffer_key].flags.writeable = True
+        return self.buffers[buffer_key]
+
+    def holds(self, operands):
+        return len(self.buffer_ids) > 0 and any(id(operand) in self.buffer_ids for operand in operands)
+
+    def generation(self, values):
+        return self.generations.get(id(values))
+
+    def clear(self):
+        self.buffers.clear()
+        self.buffer_ids.clear()
+        self.generations.clear()
+        self.allocated = 0
+        self.reused = 0
+
+
+FLOW_BUFFER_ARENA = FlowBufferArena()
+
+
+def configure_flow_buffer_arena(script_config, mylog):
+    FLOW_BUFFER_ARENA.clear()
+    FLOW_BUFFER_ARENA.enabled = read_config_flag(script_config, 'Flow_Buffer_Arena', False)
+    if FLOW_BUFFER_ARENA.enabled and read_config_flag(script_config, 'Incremental_Recompute', False):
+        mylog.warning('Flow_Buffer_Arena is not used together with Incremental_Recompute, which keeps the flows of '
+                      'all scenarios.')
+    mylog.info('Flow buffer arena: ' + str(FLOW_BUFFER_ARENA.enabled))
+
+
+def einsum_output_shape(subscripts, operands):
+    input_subscripts, output_subscripts = subscripts.replace(' ', '').split('->')
+    index_sizes = {}
+    batch_shapes = []
+    for operand, subs in zip(operands, input_subscripts.split(',')):
+        subs = subs.replace('...', '')
+        batch_shapes.append(operand.shape[:operand.ndim - len(subs)])
+        index_sizes.update(zip(subs, operand.shape[operand.ndim - len(subs):]))
+    return np.broadcast_shapes(*batch_shapes) + tuple(index_sizes[index] for index in
+                                                      output_subscripts.replace('...', ''))
+
+
+def einsum_contraction_path(subscripts, operands):
+    path_key = (subscripts, tuple(operand.shape for operand in operands), EINSUM_PLAIN_LOOP['enabled'])
+    if path_key not in EINSUM_CONTRACTION_PATHS:
+        input_subscripts = subscripts.replace(' ', '').split('->')[0].split(',')
+        if EINSUM_PLAIN_LOOP['enabled'] and \
+                all(operand.ndim == len(subs.replace('...', '')) for operand, subs in zip(operands, input_subscripts)):
+            EINSUM_CONTRACTION_PATHS[path_key] = False
+        else:
+            EINSUM_CONTRACTION_PATHS[path_key] = np.einsum_path(subscripts, *operands, optimize='optimal')[0]
+    return EINSUM_CONTRACTION_PATHS[path_key]
+
+
+def sparse_reduction(sparse_subscripts, sparse_operand, output_subscripts):
+    output_shape = [sparse_operand.shape[sparse_subscripts.index(index)] for index in output_subscripts]
+    output_positions = np.ravel_multi_index(
+        tuple(sparse_operand.coords[sparse_subscripts.index(index)] for index in output_subscripts), output_shape)
+    return np.bincount(output_positions, weights=sparse_operand.data,
+                       minlength=int(np.prod(output_shape))).astype(sparse_operand.dtype).reshape(output_shape)
+
+
+def sparse_einsum(sparse_subscripts, sparse_operand, dense_subscripts, dense_operand, output_subscripts):
+    shared = [index for index in dense_subscripts if index in sparse_subscripts]
+    dense_only = [index for index in dense_subscripts if index not in sparse_subscripts]
+    dense_only_out = [index for index in dense_only if index in output_subscripts]
+    sparse_out = [index for index in output_subscripts if index in sparse_subscripts]
+    dense_operand = np.transpose(dense_operand, [dense_subscripts.index(index) for index in shared + dense_only])
+    gathered = dense_operand[tuple(sparse_operand.coords[sparse_subscripts.index(index)] for index in shared)]
+    gathered = np.einsum('k' + ''.join(dense_only) + '->k' + ''.join(dense_only_out), gathered)
+    sparse_out_shape = [sparse_operand.shape[sparse_subscripts.index(index)] for index in sparse_out]
+    out_positions = np.zeros(sparse_operand.data.size, dtype=np.intp)
+    if len(sparse_out) > 0:
+        out_positions = np.ravel_multi_index(
+            tuple(sparse_operand.coords[sparse_subscripts.index(index)] for index in sparse_out), sparse_out_shape)
+    scatter = scipy.sparse.csr_matrix(
+        (sparse_operand.data, (out_positions, np.arange(sparse_operand.data.size))),
+        shape=(int(np.prod(sparse_out_shape)), sparse_operand.data.size))
+    result = scatter @ gathered.reshape(sparse_operand.data.size, -1)
+    result = result.reshape(sparse_out_shape + list(gathered.shape[1:]))
+    return np.ascontiguousarray(np.einsum(''.join(sparse_out + dense_only_out) + '->' + output_subscripts, result))
+
+
+class LazyParameterDict(MutableMapping):
+    def __init__(self, parameter_readers, parameter_bytes=None):
+        self.parameter_readers = parameter_readers
+        self.parameter_bytes = parameter_bytes or {}
+        self.parameters = {}
+
+    def __getitem__(self, par_name):
+        if par_name not in self.parameters:
+            self.parameters[par_name] = self.parameter_readers[par_name]()
+        return self.parameters[par_name]
+
+    def __setitem__(self, par_name, parameter):
+        self.parameters[par_name] = parameter
+
+    def __delitem__(self, par_name):
+        self.parameters.pop(par_name, None)
+        self.parameter_readers.pop(par_name, None)
+
+    def __contains__(self, par_name):
+        return par_name in self.parameter_readers or par_name in self.parameters
+
+    def __iter__(self):
+        return iter(dict.fromkeys(list(self.parameter_readers) + list(self.parameters)))
+
+    def __len__(self):
+        return len(set(self.parameter_readers) | set(self.parameters))
+
+    def loaded_parameters(self):
+        return list(self.parameters)
+
+    def unloaded_bytes(self, par_names):
+        return sum(self.parameter_bytes.get(par_name, 0) for par_name in set(par_names)
+                   if par_name not in self.parameters)
+
+
+def read_parameters_parallel(data_path, index_table, index_table_classification_names, master_classification,
+                             mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names, pl_version,
+                             script_config, cache_path, read_workers, region_bounds=None):
+    read_workers = min(read_workers, len(pl_names))
+    mylog.info('Reading parameters with ' + str(read_workers) + ' worker processes')
+    print('Reading parameters with ' + str(read_workers) + ' worker processes')
+    index_sizes = region_index_sizes(index_table, region_bounds)
+    shared_blocks = []
+    read_jobs = []
+    try:
+        with ProcessPoolExecutor(max_workers=read_workers) as read_pool:
+            for mo in range(0, len(pl_names)):
+                par_shape = tuple(int(index_sizes[index_letter]) for index_letter in pl_index_structure[mo])
+                shared_block = shared_memory.SharedMemory(
+                    create=True, size=max(int(np.prod(par_shape)) * np.float64().itemsize, 1))
+                shared_blocks.append((shared_block, par_shape))
+                read_jobs.append(read_pool.submit(read_parameter_into_shared_memory, shared_block.name, par_shape,
+                                                  os.path.join(data_path, pl_version[mo]), pl_names[mo],
+                                                  pl_index_structure[mo], pl_index_match[mo], pl_index_layer[mo],
+                                                  master_classification, index_table,
+                                                  index_table_classification_names, script_config, cache_path,
+                                                  mylog, region_bounds))
+            meta_data_list = [read_job.result() for read_job in read_jobs]
+    except BaseException:
+        for shared_block, par_shape in shared_blocks:
+            shared_block.close()
+        raise
+    finally:
+        for shared_block, par_shape in shared_blocks:
+            shared_block.unlink()
+    parameters = []
+    for mo in range(0, len(pl_names)):
+        shared_block, par_shape = shared_blocks[mo]
+        SHARED_PARAMETER_BLOCKS.append(shared_block)
+        parameters.append((meta_data_list[mo], np.ndarray(par_shape, dtype=np.float64, buffer=shared_block.buf)))
+    return parameters
+
+
+def read_parameter_into_shared_memory(shared_block_name, par_shape, par_path, par_name, par_index_structure,
+                                      par_index_match, par_index_layer, master_classification, index_table,
+                                      index_table_classification_names, script_config, cache_path, mylog,
+                                      region_bounds=None):
+    print('Reading parameter ' + par_name)
+    mylog.info('Reading parameter' + par_name)
+    meta_data, values = read_parameter(par_path, par_name, par_index_structure, par_index_match, par_index_layer,
+                                       master_classification, index_table, index_table_classification_names,
+                                       script_config, cache_path, mylog, region_bounds)
+    shared_block = shared_memory.SharedMemory(name=shared_block_name)
+    try:
+        shared_values = np.ndarray(par_shape, dtype=np.float64, buffer=shared_block.buf)
+        shared_values[...] = values
+        del shared_values
+    finally:
+        shared_block.close()
+    return meta_data
+
+
+def read_parameter(par_path, par_name, par_index_structure, par_index_match, par_index_layer, master_classification,
+                   index_table, index_table_classification_names, script_config, cache_path, mylog,
+                   region_bounds=None):
+    par_file = find_parameter_file(par_path, script_config)
+    if cache_path is None:
+        if region_bounds is not None:
+            index_table = region_shard_index_table(index_table, region_bounds[0], region_bounds[1])
+        return read_parameter_file(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                                   master_classification, index_table, index_table_classification_names,
+                                   script_config, mylog)
+    cache_key = parameter_cache_key(parameter_source_files(par_file), par_index_structure, par_index_match,
+                                    par_index_layer, index_table)
+    cached_parameter = read_parameter_cache(cache_path, par_name, cache_key, None if region_bounds is None else 'r')
+    if cached_parameter is not None:
+        mylog.info('Parameter ' + par_name + ' loaded from cache.')
+        meta_data, values = cached_parameter
+    else:
+        meta_data, values = read_parameter_file(par_file, par_name, par_index_structure, par_index_match,
+                                                par_index_layer, master_classification, index_table,
+                                                index_table_classification_names, script_config, mylog)
+        write_parameter_cache(cache_path, par_name, cache_key, meta_data, values)
+    return meta_data, region_parameter_values(values, par_index_structure, region_bounds)
+
+
+def find_parameter_file(par_path, script_config):
+    preferred_format = '.' + str(read_config_option(script_config, 'Parameter_File_Format', 'xlsx')).strip('. ')
+    par_formats = [preferred_format] + [par_format for par_format in PARAMETER_FILE_READERS
+                                        if par_format != preferred_format]
+    for par_format in par_formats:
+        if os.path.isfile(par_path + par_format):
+            return par_path + par_format
+    return par_path + '.xlsx'
+
+
+def parameter_source_files(par_file):
+    par_meta_file = os.path.splitext(par_file)[0] + '.json'
+    if not par_file.endswith('.xlsx') and os.path.isfile(par_meta_file):
+        return [par_file, par_meta_file]
+    return [par_file]
+
+
+def read_parameter_file(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                        master_classification, index_table, index_table_classification_names, script_config, mylog):
+    par_reader = PARAMETER_FILE_READERS[os.path.splitext(par_file)[1]]
+    return par_reader(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                      master_classification, index_table, index_table_classification_names, script_config, mylog)
+
+
+def read_config_flag(script_config, key, default):
+    value = script_config.get(key)
+    if value is None:
+        return default
+    return str(value).strip().lower() == 'true'
+
+
+def read_config_option(script_config, key, default):
+    value = script_config.get(key)
+    if value is None or str(value).strip() == '':
+        return default
+    return value
+
+
+def read_config_overrides(script_config, mylog):
+    for argument in sys.argv[1:]:
+        if '=' not in argument:
+            mylog.error('CONFIG OVERRIDE ERROR: ' + argument + ' is not of the form Option=Value and is ignored.')
+            continue
+        key, value = argument.split('=', 1)
+        script_config[key.strip()] = value.strip()
+        mylog.info('Config option ' + key.strip() + ' set to ' + value.strip() + ' from the command line')
+    return script_config
+
+
+def read_scenario_selection(script_config, mylog):
+    scenario_selection = str(read_config_option(script_config, 'Scenario_Selection', 'All'))
+    if scenario_selection.strip().lower() == 'all':
+        return list(SCENARIO_NAMES)
+    selected_scenarios = []
+    for scenario_name in scenario_selection.split(','):
+        scenario_name = scenario_name.strip()
+        if scenario_name in SCENARIO_NAMES:
+            selected_scenarios.append(scenario_name)
+        else:
+            mylog.error('SCENARIO SELECTION ERROR: Scenario ' + scenario_name + ' is not defined in the model.')
+    mylog.info('Selected scenarios: ' + ', '.join(selected_scenarios))
+    return selected_scenarios
+
+
+def limit_blas_threads(script_config, mylog):
+    blas_threads = read_config_option(script_config, 'BLAS_Threads', None)
+    if blas_threads is None:
+        return None
+    if threadpool_limits is None:
+        mylog.warning('BLAS_Threads is set, but threadpoolctl is not installed. The thread count is not changed.')
+        return None
+    mylog.info('Number of BLAS threads: ' + str(int(blas_threads)))
+    return threadpool_limits(limits=int(blas_threads), user_api='blas')
+
+
+def read_model_precision(script_config, mylog):
+    model_precision = str(read_config_option(script_config, 'Model_Precision', 'float64')).strip().lower()
+    if model_precision not in ('float64', 'float32'):
+        mylog.error('MODEL PRECISION ERROR: ' + model_precision + ' is not supported, float64 is used instead.')
+        model_precision = 'float64'
+    return np.dtype(model_precision)
+
+
+def define_parameter_cache_path(data_path, script_config, mylog):
+    if not read_config_flag(script_config, 'Parameter_Cache', True):
+        mylog.info('Parameter cache disabled')
+        return None
+    cache_path = read_config_option(script_config, 'Parameter_Cache_Path',
+                                    os.path.join(data_path, 'parameter_cache'))
+    os.makedirs(cache_path, exist_ok=True)
+    mylog.info('Parameter cache located at ' + cache_path)
+    return cache_path
+
+
+def parameter_cache_key(par_files, par_index_structure, par_index_match, par_index_layer, index_table):
+    cache_key = hashlib.sha256()
+    cache_key.update(str(PARAMETER_CACHE_VERSION).encode())
+    for par_file in par_files:
+        cache_key.update(os.path.basename(par_file).encode())
+        with open(par_file, 'rb') as par_content:
+            for block in iter(lambda: par_content.read(1 << 20), b''):
+                cache_key.update(block)
+    cache_key.update(repr((par_index_structure, par_index_match, par_index_layer)).encode())
+    for aspect in index_table.index:
+        cache_key.update(repr((aspect,
+                               index_table.loc[aspect].IndexLetter,
+                               index_table.loc[aspect].Classification.Name,
+                               index_table.loc[aspect].Classification.Items)).encode())
+    return cache_key.hexdigest()
+
+
+def parameter_cache_file(cache_path, par_name, cache_key, cache_extension):
+    return os.path.join(cache_path, par_name + '.' + cache_key[:16] + cache_extension)
+
+
+def read_parameter_cache(cache_path, par_name, cache_key, mmap_mode=None):
+    meta_file = parameter_cache_file(cache_path, par_name, cache_key, '.npz')
+    values_file = parameter_cache_file(cache_path, par_name, cache_key, '.npy')
+    if not os.path.isfile(meta_file) or not os.path.isfile(values_file):
+        return None
+    with np.load(meta_file, allow_pickle=False) as cached_parameter:
+        if str(cached_parameter['cache_key']) != cache_key:
+            return None
+        meta_data = pickle.loads(cached_parameter['meta_data'].tobytes())
+    return meta_data, np.load(values_file, mmap_mode=mmap_mode, allow_pickle=False)
+
+
+def write_parameter_cache(cache_path, par_name, cache_key, meta_data, values):
+    write_cache_file(cache_path, par_name, parameter_cache_file(cache_path, par_name, cache_key, '.npy'),
+                     partial(np.save, arr=values))
+    write_cache_file(cache_path, par_name, parameter_cache_file(cache_path, par_name, cache_key, '.npz'),
+                     partial(np.savez, cache_key=np.array(cache_key),
+                             meta_data=np.frombuffer(pickle.dumps(meta_data), dtype=np.uint8)))
+
+
+def write_cache_file(cache_path, par_name, cache_file, save_cache):
+    with tempfile.NamedTemporaryFile(dir=cache_path, prefix=par_name + '.', suffix='.tmp',
+                                     delete=False) as temporary_file:
+        try:
+            save_cache(temporary_file)
+        except BaseException:
+            temporary_file.close()
+            os.remove(temporary_file.name)
+            raise
+    os.replace(temporary_file.name, cache_file)
+
+
+def region_parameter_values(values, par_index_structure, region_bounds):
+    if region_bounds is None:
+        return values
+    if 'r' not in par_index_structure:
+        return np.array(values)
+    return np.array(values[(slice(None),) * par_index_structure.index('r') + (slice(*region_bounds),)])
+
+
+def read_parameter_xlsx(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                        master_classification, index_table, index_table_classification_names, script_config, mylog):
+    if str(read_config_option(script_config, 'XLSX_Reader', 'odym')).lower() == 'streaming':
+        return read_parameter_xlsx_streaming(par_file, par_name, par_index_structure, par_index_match,
+                                             par_index_layer, index_table, script_config, mylog)
+    return msf.ReadParameterXLSX(os.path.splitext(par_file)[0], par_name, par_index_structure, par_index_match,
+                                 par_index_layer, master_classification, index_table,
+                                 index_table_classification_names, script_config, mylog, False)
+
+
+def read_parameter_xlsx_streaming(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                                  index_table, script_config, mylog):
+    par_workbook = openpyxl.load_workbook(par_file, read_only=True, data_only=True)
+    try:
+        cover_rows = [list(row) for row in par_workbook['Cover'].iter_rows(values_only=True)]
+        meta_data, ri = read_parameter_cover(cover_rows)
+        if script_config.get('Version of master classification') != \
+                meta_data.get('Dataset_Classification_version_number'):
+            mylog.critical('CLASSIFICATION FILE FATAL ERROR: Classification file of parameter ' + par_name +
+                           ' is not identical to the classification master file used for the current model run.')
+        index_by_letter = index_table.set_index('IndexLetter')
+        par_shape = [int(index_by_letter.loc[index_letter]['IndexSize']) for index_letter in par_index_structure]
+        values = np.zeros(par_shape)
+        values_inserted = np.zeros(par_shape, dtype=bool)
+        item_positions = []
+        for index_letter in par_index_structure:
+            item_positions.append({normalize_item(item): position for position, item in
+                                   enumerate(index_by_letter.loc[index_letter].Classification.Items)})
+        index_match = eval(par_index_match)
+        file_aspects = [index_match.index(fa) for fa in range(0, len(index_match))]
+        if cover_rows[ri][1] == 'LIST':
+            values_read = stream_parameter_list(par_workbook, cover_rows, ri, file_aspects, item_positions, values,
+                                                values_inserted)
+        else:
+            values_read = stream_parameter_table(par_workbook, cover_rows, ri, file_aspects, item_positions,
+                                                 eval(par_index_layer), values, values_inserted)
+    finally:
+        par_workbook.close()
+    mylog.info('A total of ' + str(values_read) + ' values was read from file for parameter ' + par_name + '.')
+    mylog.info(str(float(values_inserted.sum())) + ' of ' + str(int(np.prod(par_shape))) + ' values for parameter ' +
+               par_name + ' were assigned.')
+    return meta_data, values
+
+
+def read_parameter_cover(cover_rows):
+    meta_data = {}
+    ri = 1
+    while cover_rows[ri][0] not in ('[Empty on purpose]', 'Dataset_RecordType'):
+        cover_row = cover_rows[ri] + [None] * 4
+        meta_data[cover_row[0]] = cover_row[1]
+        if cover_row[0] == 'Dataset_Unit' and cover_row[1] == 'GLOBAL':
+            meta_data['Unit_Global'] = cover_row[2]
+            meta_data['Unit_Global_Comment'] = cover_row[3]
+        if cover_row[0] == 'Dataset_Uncertainty' and cover_row[1] == 'GLOBAL':
+            meta_data['Dataset_Uncertainty_Global'] = cover_row[2]
+        if cover_row[0] == 'Dataset_Uncertainty' and cover_row[1] == 'TABLE':
+            meta_data['Dataset_Uncertainty_Sheet'] = cover_row[2]
+        if cover_row[0] == 'Dataset_Comment' and cover_row[1] == 'GLOBAL':
+            meta_data['Dataset_Comment_Global'] = cover_row[2]
+        ri += 1
+    while cover_rows[ri][0] != 'Dataset_RecordType':
+        ri += 1
+    return meta_data, ri
+
+
+def read_cover_column(cover_rows, ri, ci):
+    column_entries = []
+    while ri < len(cover_rows) and ci < len(cover_rows[ri]) and cover_rows[ri][ci] is not None:
+        column_entries.append(cover_rows[ri][ci])
+        ri += 1
+    return column_entries
+
+
+def normalize_item(item):
+    if isinstance(item, float) and item.is_integer():
+        return int(item)
+    return item
+
+
+def stream_parameter_table(par_workbook, cover_rows, ri, file_aspects, item_positions, par_index_layer, values,
+                           values_inserted):
+    row_aspects = read_cover_column(cover_rows, ri + 2, 0)
+    col_aspects = read_cover_column(cover_rows, ri + 2, 2)
+    value_layers = read_cover_column(cover_rows, ri + 2, 4)
+    row_nos = int(cover_rows[ri][3])
+    col_nos = int(cover_rows[ri][5])
+    row_dims = [file_aspects[fa] for fa in range(0, len(row_aspects))]
+    col_dims = [file_aspects[fa] for fa in range(len(row_aspects), len(row_aspects) + len(col_aspects))]
+    value_rows = par_workbook[value_layers[par_index_layer[0]]].iter_rows(values_only=True)
+    col_positions = np.zeros((len(col_aspects), col_nos), dtype=int)
+    col_assigned = np.ones(col_nos, dtype=bool)
+    for ca in range(0, len(col_aspects)):
+        col_labels = next(value_rows)[len(row_aspects):len(row_aspects) + col_nos]
+        for cx in range(0, col_nos):
+            position = item_positions[col_dims[ca]].get(normalize_item(col_labels[cx]))
+            if position is None:
+                col_assigned[cx] = False
+            else:
+                col_positions[ca, cx] = position
+    target_position = [None] * values.ndim
+    for ca in range(0, len(col_aspects)):
+        target_position[col_dims[ca]] = col_positions[ca, col_assigned]
+    for value_row in islice(value_rows, row_nos):
+        row_assigned = True
+        for ra in range(0, len(row_aspects)):
+            position = item_positions[row_dims[ra]].get(normalize_item(value_row[ra]))
+            if position is None:
+                row_assigned = False
+                break
+            target_position[row_dims[ra]] = position
+        if row_assigned:
+            row_values = np.array(value_row[len(row_aspects):len(row_aspects) + col_nos], dtype=float)[col_assigned]
+            values[tuple(target_position)] = np.nan_to_num(row_values)
+            values_inserted[tuple(target_position)] = ~np.isnan(row_values)
+    return row_nos * col_nos
+
+
+def stream_parameter_list(par_workbook, cover_rows, ri, file_aspects, item_positions, values, values_inserted):
+    list_aspects = [ci for ci in range(1, len(cover_rows[ri + 1])) if cover_rows[ri + 1][ci] is not None]
+    value_rows = par_workbook['Values_Master'].iter_rows(min_row=2, values_only=True)
+    values_read = 0
+    for value_row in value_rows:
+        if len(value_row) <= len(list_aspects) or value_row[len(list_aspects)] is None:
+            break
+        values_read += 1
+        target_position = [None] * values.ndim
+        for fa in range(0, len(list_aspects)):
+            target_position[file_aspects[fa]] = item_positions[file_aspects[fa]].get(normalize_item(value_row[fa]))
+        if None not in target_position:
+            values[tuple(target_position)] = value_row[len(list_aspects)]
+            values_inserted[tuple(target_position)] = True
+    return values_read
+
+
+class WorkbookValues:
+    def __init__(self, file_path):
+        self.workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        self.sheets = {}
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self.sheets:
+            self.sheets[sheet_name] = WorksheetValues(self.workbook[sheet_name])
+        return self.sheets[sheet_name]
+
+    def close(self):
+        self.workbook.close()
+
+
+class WorksheetValues:
+    def __init__(self, worksheet):
+        self.title = worksheet.title
+        self.rows = [row for row in worksheet.iter_rows(values_only=True)]
+        self.max_row = len(self.rows)
+        self.max_column = max([len(row) for row in self.rows], default=0)
+
+    def cell(self, row, column):
+        if row <= self.max_row and column <= len(self.rows[row - 1]):
+            return CellValue(self.rows[row - 1][column - 1])
+        return CellValue(None)
+
+
+CellValue = namedtuple('CellValue', 'value')
+
+
+def read_parameter_table(par_file, par_name, par_index_structure, par_index_match, par_index_layer,
+                         master_classification, index_table, index_table_classification_names, script_config, mylog,
+                         table_reader):
+    par_table = table_reader(par_file)
+    with open(os.path.splitext(par_file)[0] + '.json') as par_meta_file:
+        meta_data = json.load(par_meta_file)
+    index_by_letter = index_table.set_index('IndexLetter')
+    par_shape = []
+    target_positions = []
+    for index_letter in par_index_structure:
+        classification = index_by_letter.loc[index_letter].Classification
+        if classification.Name not in par_table.columns:
+            mylog.error('CLASSIFICATION ERROR: Classification ' + classification.Name + ' for aspect ' +
+                        index_letter + ' of parameter ' + par_name + ' is missing in ' + par_file)
+            raise KeyError(classification.Name)
+        item_positions = {str(item): position for position, item in enumerate(classification.Items)}
+        par_shape.append(len(classification.Items))
+        target_positions.append(par_table[classification.Name].astype(str).map(item_positions).to_numpy())
+    assigned = np.all([~np.isnan(positions) for positions in target_positions], axis=0)
+    values = np.zeros(par_shape)
+    values[tuple(positions[assigned].astype(int) for positions in target_positions)] = \
+        par_table['Value'].to_numpy(dtype=float)[assigned]
+    mylog.info('A total of ' + str(len(par_table)) + ' values was read from file for parameter ' + par_name + '.')
+    mylog.info(str(int(assigned.sum())) + ' of ' + str(int(np.prod(par_shape))) + ' values for parameter ' +
+               par_name + ' were assigned.')
+    return meta_data, values
+
+
+def read_csv_table(par_file):
+    return pd.read_csv(par_file, keep_default_na=False, float_precision='round_trip')
+
+
+def read_hdf_table(par_file):
+    return pd.read_hdf(par_file, 'values')
+
+
+def write_parquet_table(par_table, par_file):
+    par_table.to_parquet(par_file, index=False)
+
+
+def write_csv_table(par_table, par_file):
+    par_table.to_csv(par_file, index=False)
+
+
+def write_hdf_table(par_table, par_file):
+    par_table.to_hdf(par_file, key='values', mode='w', format='table')
+
+
+PARAMETER_FILE_READERS = {'.xlsx': read_parameter_xlsx,
+                          '.parquet': partial(read_parameter_table, table_reader=pd.read_parquet),
+                          '.csv': partial(read_parameter_table, table_reader=read_csv_table),
+                          '.h5': partial(read_parameter_table, table_reader=read_hdf_table)}
+PARAMETER_TABLE_WRITERS = {'.parquet': write_parquet_table,
+                           '.csv': write_csv_table,
+                           '.h5': write_hdf_table}
+
+
+def convert_parameter_files(data_path, index_table, index_table_classification_names, master_classification, mylog,
+                            pl_index_layer, pl_index_match, pl_index_structure, pl_names, pl_version, script_config,
+                            target_format):
+    target_format = '.' + str(target_format).strip('. ')
+    mylog.info('Convert parameter files to ' + target_format)
+    print('Convert parameter files to ' + target_format)
+    full_index_table = index_table.copy()
+    full_index_table['Classification'] = [master_classification[classification.Name]
+                                          for classification in index_table['Classification']]
+    full_index_table['IndexSize'] = [len(classification.Items) for classification in full_index_table['Classification']]
+    full_index_by_letter = full_index_table.set_index('IndexLetter')
+    for mo in range(0, len(pl_names)):
+        par_path = os.path.join(data_path, pl_version[mo])
+        if not os.path.isfile(par_path + '.xlsx'):
+            continue
+        print('Converting parameter ' + pl_names[mo])
+        meta_data, values = read_parameter_xlsx(par_path + '.xlsx', pl_names[mo], pl_index_structure[mo],
+                                                pl_index_match[mo], pl_index_layer[mo], master_classification,
+                                                full_index_table, index_table_classification_names, script_config,
+                                                mylog)
+        positions = np.nonzero(values)
+        par_table = pd.DataFrame({full_index_by_letter.loc[index_letter].Classification.Name:
+                                  np.array(full_index_by_letter.loc[index_letter].Classification.Items)[positions[m]]
+                                  for m, index_letter in enumerate(pl_index_structure[mo])})
+        par_table['Value'] = values[positions]
+        PARAMETER_TABLE_WRITERS[target_format](par_table, par_path + target_format)
+        with open(par_path + '.json', 'w') as par_meta_file:
+            json.dump(meta_data, par_meta_file, indent=1, default=str)
+    mylog.info('Conversion of parameter files finished')
+
+
+def read_stock_model(script_config, mylog):
+    stock_model = str(read_config_option(script_config, 'Stock_Model', 'exogenous')).strip().lower()
+    if stock_model not in ('exogenous', 'inflow_driven', 'stock_driven'):
+        mylog.error('STOCK MODEL ERROR: ' + stock_model + ' is not supported, exogenous is used instead.')
+        stock_model = 'exogenous'
+    mylog.info('Building stock model: ' + stock_model)
+    return stock_model
+
+
+def solve_dynamic_building_stock(parameter_dict, index_table, model_time_start, script_config, stock_model, mylog):
+    if stock_model == 'inflow_driven':
+        mylog.info('Calculate building stock and demolition from construction and building lifetimes')
+        print('Calculate building stock and demolition from construction and building lifetimes')
+    else:
+        mylog.info('Calculate construction and demolition from building stock and building lifetimes')
+        print('Calculate construction and demolition from building stock and building lifetimes')
+    building_variants = sorted(set(scenario_definition['buildings'] for scenario_definition in
+                                   SCENARIO_DEFINITIONS.values()))
+    for building_variant in building_variants:
+        if 'par_building_inflow' + building_variant not in parameter_dict:
+            continue
+        inflow_parameter = parameter_dict['par_building_inflow' + building_variant]
+        stock_parameter = parameter_dict['par_building_stock' + building_variant]
+        outflow_parameter = parameter_dict['par_building_outflow' + building_variant]
+        building_inflow = dense_values(inflow_parameter.Values).astype(np.float64)
+        initial_stock = dense_values(stock_parameter.Values)[..., 0] - building_inflow[..., 0] - \
+            dense_values(outflow_parameter.Values)[..., 0]
+        survival, initial_survival = building_survival(parameter_dict, index_table, model_time_start,
+                                                       building_inflow.shape, script_config)
+        if stock_model == 'stock_driven':
+            shares = cohort_shares(building_inflow, index_table, model_time_start)
+            building_inflow = stock_driven_inflow(dense_values(stock_parameter.Values).sum(axis=2), initial_stock,
+                                                  survival, initial_survival, shares)
+            if (building_inflow < 0).any():
+                mylog.warning('STOCK MODEL WARNING: negative construction of ' + inflow_parameter.Name +
+                              ' where the building stock declines faster than the building lifetimes allow')
+            set_parameter_values(inflow_parameter, building_inflow)
+        building_stock, building_outflow = inflow_driven_stock(building_inflow, initial_stock, survival,
+                                                               initial_survival)
+        set_parameter_values(stock_parameter, building_stock)
+        set_parameter_values(outflow_parameter, building_outflow)
+        for parameter in (inflow_parameter, stock_parameter, outflow_parameter):
+            parameter.MetaData['Stock_Model'] = stock_model
+
+
+def check_stock_model_parameters(parameter_dict, par_names, calculation, mylog=None):
+    derived_names = [par_name for par_name in dict.fromkeys(par_names)
+                     if parameter_dict[par_name].MetaData.get('Stock_Model', 'exogenous') != 'exogenous']
+    if len(derived_names) == 0:
+        return
+    error_message = calculation + ' varies ' + ', '.join(derived_names) + \
+        ' independently, but the stock model derives these parameters from each other. Use Stock_Model exogenous.'
+    if mylog is not None:
+        mylog.error('STOCK MODEL ERROR: ' + error_message)
+    raise ValueError(error_message)
+
+
+def set_parameter_values(parameter, values):
+    values = values.astype(parameter.Values.dtype)
+    if isinstance(parameter.Values, SparseValues):
+        values = sparse_values(values)
+    parameter.Values = values
+
+
+def building_survival(parameter_dict, index_table, model_time_start, building_shape, script_config):
+    if 'par_building_lifetime' in parameter_dict:
+        lifetime = dense_values(parameter_dict['par_building_lifetime'].Values).astype(np.float64)
+    else:
+        lifetime = np.full(building_shape[:2], float(read_config_option(script_config, 'Building_Lifetime', 80)))
+    lifetime_shape = float(read_config_option(script_config, 'Building_Lifetime_Shape', 2.5))
+    lifetime_scale = lifetime / math.gamma(1 + 1 / lifetime_shape)
+    ages = np.arange(building_shape[-1], dtype=np.float64)
+    survival = weibull_survival(ages, lifetime_scale[..., np.newaxis], lifetime_shape)
+    cohort_items = index_table.set_index('IndexLetter').loc['a'].Classification.Items
+    initial_ages = np.maximum(model_time_start - 1 - cohort_years(cohort_items), 0)
+    initial_ages = initial_ages[:, np.newaxis] + np.zeros((1, building_shape[-1]))
+    lifetime_scale = lifetime_scale[:, :, np.newaxis, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        initial_survival = weibull_survival(initial_ages + 1 + ages, lifetime_scale, lifetime_shape) / \
+            weibull_survival(initial_ages, lifetime_scale, lifetime_shape)
+    return survival, np.nan_to_num(initial_survival)
+
+
+def weibull_survival(ages, lifetime_scale, lifetime_shape):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.exp(-(ages / lifetime_scale) ** lifetime_shape)
+
+
+def cohort_years(cohort_items):
+    years = []
+    for cohort_item in cohort_items:
+        item_years = [int(year) for year in re.findall(r'\d{4}', str(cohort_item))]
+        years.append(np.mean(item_years) if len(item_years) > 0 else np.nan)
+    years = np.array(years)
+    return np.where(np.isnan(years), np.nanmax(years, initial=0), years)
+
+
+def inflow_driven_stock(building_inflow, initial_stock, survival, initial_survival):
+    cohort_stock = causal_convolution(building_inflow, survival[:, :, np.newaxis, :])
+    building_stock = initial_stock[..., np.newaxis] * initial_survival + cohort_stock
+    previous_stock = np.concatenate((initial_stock[..., np.newaxis], building_stock[..., :-1]), axis=-1)
+    building_outflow = building_stock - previous_stock - building_inflow
+    return building_stock, building_outflow
+
+
+def stock_driven_inflow(building_stock, initial_stock, survival, initial_survival, shares):
+    new_stock = building_stock - (initial_stock[..., np.newaxis] * initial_survival).sum(axis=2)
+    return causal_convolution(new_stock, inverse_survival_kernel(survival))[:, :, np.newaxis, :] * shares
+
+
+def cohort_shares(building_inflow, index_table, model_time_start):
+    cohort_items = index_table.set_index('IndexLetter').loc['a'].Classification.Items
+    model_years = model_time_start + np.arange(building_inflow.shape[-1])
+    calendar_cohorts = np.abs(cohort_years(cohort_items)[:, np.newaxis] - model_years).argmin(axis=0)
+    calendar_shares = np.zeros(building_inflow.shape[2:])
+    calendar_shares[calendar_cohorts, np.arange(len(model_years))] = 1
+    inflow_total = building_inflow.sum(axis=2, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(inflow_total > 0, building_inflow / inflow_total, calendar_shares)
+
+
+def inverse_survival_kernel(survival):
+    time_items = survival.shape[-1]
+    inverse = 1 / survival[..., :1]
+    while inverse.shape[-1] < time_items:
+        length = min(2 * inverse.shape[-1], time_items)
+        inverse = np.concatenate((inverse, np.zeros(inverse.shape[:-1] + (length - inverse.shape[-1],))), axis=-1)
+        inverse = 2 * inverse - causal_convolution(inverse, causal_convolution(survival[..., :length], inverse))
+    return inverse
+
+
+def causal_convolution(values, kernel):
+    time_items = values.shape[-1]
+    fft_size = 2 ** int(np.ceil(np.log2(2 * time_items)))
+    return np.fft.irfft(np.fft.rfft(values, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)[..., :time_items]
+
+
 def define_mfa_system(index_table, model_time_end, model_time_start, parameter_dict, mylog):
     mylog.info('Define MFA system and processes')
     print('Define MFA system and processes.')
@@ -261,306 +1463,902 @@ def add_stocks_mfa(building_mfa_system, mylog):
         msc.Stock(Name='Concrete stock change in buildings', P_Res=9, Type=1, Indices='r,o,t', Values=None)
 
 
+def initialize_flow_values(building_mfa_system, dtype, lazy=False):
+    index_sizes = building_mfa_system.IndexTable.set_index('IndexLetter')['IndexSize']
+    for flow in building_mfa_system.FlowDict.values():
+        flow.Values = zero_values(tuple(int(index_sizes[x]) for x in flow.Indices.split(',')), dtype, lazy)
+
+
+def initialize_stock_values(building_mfa_system, dtype, lazy=False):
+    index_sizes = building_mfa_system.IndexTable.set_index('IndexLetter')['IndexSize']
+    for stock in building_mfa_system.StockDict.values():
+        stock.Values = zero_values(tuple(int(index_sizes[x]) for x in stock.Indices.split(',')), dtype, lazy)
+
+
+def zero_values(shape, dtype, lazy=False):
+    if lazy:
+        return np.broadcast_to(np.zeros((), dtype=dtype), shape)
+    return np.zeros(shape, dtype=dtype)
+
+
+def write_precision_report(building_mfa_system, data_path, results_path, index_table,
+                           index_table_classification_names, master_classification, mylog, pl_index_layer,
+                           pl_index_match, pl_index_structure, pl_names, pl_version, pr_l_name, pr_l_number,
+                           model_time_end, model_time_start, script_config, scenario_selection):
+    mylog.info('Compare model results with float64 results')
+    print('Compare model results with float64 results')
+    reference_config = dict(script_config)
+    reference_config['Model_Precision'] = 'float64'
+    reference_system = define_mfa_system(index_table, model_time_end, model_time_start,
+                                         read_data_and_parameters(data_path, index_table,
+                                                                  index_table_classification_names,
+                                                                  master_classification, mylog, pl_index_layer,
+                                                                  pl_index_match, pl_index_structure, pl_names,
+                                                                  pl_version, reference_config), mylog)
+    add_processes_mfa(reference_system, pr_l_name, pr_l_number, mylog)
+    add_flows_mfa(reference_system, mylog)
+    add_stocks_mfa(reference_system, mylog)
+    lazy_values = read_config_flag(script_config, 'Lazy_Flow_Values', False)
+    initialize_flow_values(reference_system, np.float64, lazy_values)
+    initialize_stock_values(reference_system, np.float64, lazy_values)
+    report_rows = []
+    for scenario_name in scenario_selection:
+        scenario_result = SCENARIO_SOLVERS[scenario_name](building_mfa_system, mylog)
+        scenario_values = {key: dense_values(scenario_result.values(key)).astype(np.float64)
+                           for key in scenario_result.keys()}
+        reference_result = SCENARIO_SOLVERS[scenario_name](reference_system, mylog)
+        for key in scenario_result.keys():
+            values = scenario_values[key]
+            reference_values = dense_values(reference_result.values(key))
+            deviation = np.abs(values - reference_values)
+            nonzero = reference_values != 0
+            max_deviation = 0.0
+            if nonzero.any():
+                max_deviation = float((deviation[nonzero] / np.abs(reference_values[nonzero])).max())
+            report_rows.append([scenario_name, key, max_deviation, float(deviation.max(initial=0))])
+    precision_report = pd.DataFrame(report_rows, columns=['Scenario', 'Flow or stock', 'Max relative deviation',
+                                                          'Max absolute deviation'])
+    precision_report.to_csv(os.path.join(results_path, 'precision_report.csv'), index=False)
+    worst = precision_report.loc[precision_report['Max relative deviation'].idxmax()]
+    mylog.info('Maximum relative deviation from float64 results: ' + str(worst['Max relative deviation']) +
+               ' (' + worst['Scenario'] + ', ' + worst['Flow or stock'] + ')')
+
+
+class ScenarioResult:
+    __slots__ = ('scenario_name', 'flow_values', 'aggregates', 'buffer_generations')
+
+    def __init__(self, scenario_name, flow_values):
+        for values in flow_values.values():
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+        object.__setattr__(self, 'scenario_name', scenario_name)
+        object.__setattr__(self, 'flow_values', MappingProxyType(dict(flow_values)))
+        object.__setattr__(self, 'aggregates', {})
+        object.__setattr__(self, 'buffer_generations',
+                           {key: FLOW_BUFFER_ARENA.generation(values) for key, values in flow_values.items()
+                            if FLOW_BUFFER_ARENA.generation(values) is not None})
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Scenario results are read-only')
+
+    def keys(self):
+        return self.flow_values.keys()
+
+    def values(self, key):
+        self.check_buffer(key)
+        return self.flow_values[key]
+
+    def aggregate(self, key, subscripts):
+        if (key, subscripts) not in self.aggregates:
+            self.check_buffer(key)
+            aggregate_values = np.einsum(subscripts, dense_values(self.flow_values[key]))
+            aggregate_values.flags.writeable = False
+            self.aggregates[(key, subscripts)] = aggregate_values
+        return self.aggregates[(key, subscripts)]
+
+    def check_buffer(self, key):
+        if key in self.buffer_generations and \
+                FLOW_BUFFER_ARENA.generation(self.flow_values[key]) not in (None, self.buffer_generations[key]):
+            raise ValueError('Flow ' + key + ' of scenario ' + self.scenario_name + ' was overwritten in the flow '
+                             'buffer arena by a later scenario')
+
+
+def scenario_flow_keys(scenario_definition):
+    flow_keys = ['Construction of buildings', 'Building stock', 'Demolition of buildings', 'Building stock change',
+                 'Steel inflow', 'Steel stock in buildings', 'Steel outflow', 'Steel production', 'Scrap recycling',
+                 'Scrap other use', 'Concrete inflow', 'Concrete stock in buildings', 'Concrete outflow',
+                 'Cement production', 'Clinker production', 'Concrete reuse', 'Concrete landfill']
+    if 'element_reuse' in scenario_definition:
+        flow_keys += ['Reuse of steel element', 'Reuse of concrete element']
+    if 'steel_reuse' in scenario_definition:
+        flow_keys += ['Reuse of steel']
+    if 'cement_recycling' in scenario_definition:
+        flow_keys += ['Cement recycling']
+    if scenario_definition.get('building_types', False):
+        flow_keys += ['Steel inflow, building types', 'Concrete inflow, building types']
+    return flow_keys
+
+
+def solve_flow_graph(building_mfa_system, scenario_name, requested_flows=None):
+    scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+    if requested_flows is None:
+        requested_flows = scenario_flow_keys(scenario_definition)
+    flow_buffers = None
+    if FLOW_BUFFER_ARENA.enabled and not FLOW_GRAPH_VALUES.enabled:
+        flow_buffers = FLOW_BUFFER_ARENA
+    flow_values = evaluate_flow_graph(building_mfa_system.ParameterDict, scenario_definition, requested_flows,
+                                      FLOW_GRAPH_VALUES.scenario_values(scenario_name), flow_buffers)
+    for key, values in flow_values.items():
+        if key in building_mfa_system.StockDict:
+            building_mfa_system.StockDict[key].Values = values
+        elif key in building_mfa_system.FlowDict:
+            building_mfa_system.FlowDict[key].Values = values
+    return ScenarioResult(scenario_name, flow_values)
+
+
+def evaluate_flow_graph(parameter_dict, scenario_definition, requested_flows, node_values=None, flow_buffers=None):
+    if node_values is None:
+        node_values = {}
+    changed_nodes = changed_flow_nodes(parameter_dict, scenario_definition, requested_flows, node_values)
+    for node in flow_graph_order(requested_flows):
+        if node in changed_nodes:
+            node_values[node] = evaluate_flow_node(FLOW_GRAPH[node], node_values, parameter_dict,
+                                                   scenario_definition,
+                                                   None if flow_buffers is None else partial(flow_buffers.buffer, node))
+    FLOW_GRAPH_VALUES.evaluated += len(changed_nodes)
+    FLOW_GRAPH_VALUES.reused += len(flow_graph_order(requested_flows)) - len(changed_nodes)
+    return {key: node_values[key] for key in requested_flows if node_values[key] is not None}
+
+
+def changed_flow_nodes(parameter_dict, scenario_definition, requested_flows, node_values):
+    changed_nodes = set()
+    for node in flow_graph_order(requested_flows):
+        flow_node = FLOW_GRAPH[node]
+        if node not in node_values:
+            changed_nodes.add(node)
+        elif 'parameter' in flow_node:
+            if flow_parameter_values(flow_node, parameter_dict, scenario_definition) is not node_values[node]:
+                changed_nodes.add(node)
+        elif any(input_node in changed_nodes for input_node in flow_node_inputs(flow_node)):
+            changed_nodes.add(node)
+    return changed_nodes
+
+
+def flow_graph_order(requested_flows):
+    ordered_nodes = []
+    for node in requested_flows:
+        add_flow_node(node, ordered_nodes, [])
+    return ordered_nodes
+
+
+def add_flow_node(node, ordered_nodes, node_path):
+    if node in ordered_nodes:
+        return
+    if node in node_path:
+        raise ValueError('Flow graph contains a cycle: ' + ' -> '.join(node_path + [node]))
+    for input_node in flow_node_inputs(FLOW_GRAPH[node]):
+        add_flow_node(input_node, ordered_nodes, node_path + [node])
+    ordered_nodes.append(node)
+
+
+def flow_node_inputs(flow_node):
+    if 'terms' in flow_node:
+        return [term[2] for term in flow_node['terms']]
+    return flow_node.get('inputs', [])
+
+
+def evaluate_flow_node(flow_node, flow_values, parameter_dict, scenario_definition, flow_buffer=None):
+    if 'parameter' in flow_node:
+        return flow_parameter_values(flow_node, parameter_dict, scenario_definition)
+    if 'terms' in flow_node:
+        return evaluate_term_node(flow_node, flow_values, scenario_definition, flow_buffer)
+    if 'condition' in flow_node and not scenario_definition.get(flow_node['condition'], False):
+        return None
+    input_values = [flow_values[input_node] for input_node in flow_node['inputs']]
+    if any(values is None for values in input_values):
+        return None
+    if 'material' in flow_node:
+        return material_intensity_flows(*input_values)[flow_node['material']]
+    if flow_buffer is not None and (not FLOW_CACHE.enabled or FLOW_BUFFER_ARENA.holds(input_values)) and \
+            not any(isinstance(values, SparseValues) for values in input_values):
+        return np.einsum(flow_node['subscripts'], *input_values,
+                         out=flow_buffer(einsum_output_shape(flow_node['subscripts'], input_values),
+                                         np.result_type(*input_values)),
+                         optimize=einsum_contraction_path(flow_node['subscripts'], input_values))
+    return mfa_einsum(flow_node['subscripts'], *input_values)
+
+
+def evaluate_term_node(flow_node, flow_values, scenario_definition, flow_buffer=None):
+    terms = [(sign, subscripts, flow_values[input_node])
+             for sign, subscripts, input_node, condition in flow_node['terms']
+             if flow_values[input_node] is not None and (condition is None or
+                                                         scenario_definition.get(condition, False))]
+    if len(terms) == 0:
+        return None
+    if len(terms) > 1 and all(subscripts is None and isinstance(values, SparseValues) and
+                              values.shape == terms[0][2].shape for sign, subscripts, values in terms):
+        return sparse_term_sum([(sign, values) for sign, subscripts, values in terms])
+    terms = [(sign, subscripts, dense_values(values)) for sign, subscripts, values in terms]
+    if len(terms) == 1 and terms[0][0] > 0 and terms[0][1] is None:
+        return terms[0][2]
+    node_shape = np.broadcast_shapes(*[values.shape if subscripts is None else
+                                       einsum_output_shape(subscripts, [values])
+                                       for sign, subscripts, values in terms])
+    node_dtype = np.result_type(*[values for sign, subscripts, values in terms])
+    if flow_buffer is None:
+        node_values = np.empty(node_shape, dtype=node_dtype)
+    else:
+        node_values = flow_buffer(node_shape, node_dtype)
+    elementwise_terms = [(sign, values) for sign, subscripts, values in terms if subscripts is None]
+    node_filled = len(elementwise_terms) > 0
+    if node_filled:
+        fused_term_sum(elementwise_terms, node_values)
+    for sign, subscripts, values in terms:
+        if subscripts is None:
+            continue
+        term_values = mfa_einsum(subscripts, values)
+        if not node_filled and sign > 0:
+            np.copyto(node_values, term_values)
+        elif not node_filled:
+            np.negative(term_values, out=node_values)
+        elif sign > 0:
+            np.add(node_values, term_values, out=node_values)
+        else:
+            np.subtract(node_values, term_values, out=node_values)
+        node_filled = True
+    return node_values
+
+
+def sparse_term_sum(terms):
+    node_shape = terms[0][1].shape
+    coords = np.concatenate([values.coords for sign, values in terms], axis=1)
+    data = np.concatenate([values.data if sign > 0 else -values.data for sign, values in terms])
+    positions, inverse = np.unique(np.ravel_multi_index(tuple(coords), node_shape), return_inverse=True)
+    return SparseValues(np.array(np.unravel_index(positions, node_shape)),
+                        np.bincount(inverse, weights=data, minlength=positions.size).astype(data.dtype), node_shape)
+
+
+def fused_term_sum(terms, sum_values):
+    term_values = [values for sign, values in terms]
+    if ELEMENTWISE_BACKEND['name'] == 'numexpr' and len(terms) > 1:
+        term_names = ['t' + str(m) for m in range(0, len(terms))]
+        term_expression = ' '.join(('+ ' if sign > 0 else '- ') + term_name
+                                   for (sign, values), term_name in zip(terms, term_names))
+        numexpr.evaluate(term_expression, local_dict=dict(zip(term_names, term_values)), out=sum_values,
+                         casting='unsafe')
+        return sum_values
+    if terms[0][0] > 0:
+        np.copyto(sum_values, terms[0][1])
+    else:
+        np.negative(terms[0][1], out=sum_values)
+    for sign, values in terms[1:]:
+        if sign > 0:
+            np.add(sum_values, values, out=sum_values)
+        else:
+            np.subtract(sum_values, values, out=sum_values)
+    return sum_values
+
+
+def configure_elementwise_backend(script_config, mylog):
+    backend = str(read_config_option(script_config, 'Elementwise_Backend', 'numpy')).strip().lower()
+    if backend == 'numexpr' and numexpr is None:
+        mylog.warning('Elementwise_Backend is numexpr, but numexpr is not installed. numpy is used instead.')
+        backend = 'numpy'
+    elif backend not in ('numpy', 'numexpr'):
+        mylog.error('ELEMENTWISE BACKEND ERROR: ' + backend + ' is not supported, numpy is used instead.')
+        backend = 'numpy'
+    ELEMENTWISE_BACKEND['name'] = backend
+    mylog.info('Elementwise backend for flow balances: ' + backend)
+
+
+def flow_parameter_values(flow_node, parameter_dict, scenario_definition):
+    par_name = scenario_parameter_name(flow_node['parameter'], scenario_definition, flow_node.get('mechanism'))
+    if par_name is None:
+        return None
+    return parameter_dict[par_name].Values
+
+
+class FlowGraphValues:
+    def __init__(self):
+        self.enabled = False
+        self.scenarios = {}
+        self.evaluated = 0
+        self.reused = 0
+
+    def scenario_values(self, scenario_name):
+        if not self.enabled:
+            return {}
+        return self.scenarios.setdefault(scenario_name, {})
+
+    def clear(self):
+        self.scenarios.clear()
+        self.evaluated = 0
+        self.reused = 0
+
+
+FLOW_GRAPH_VALUES = FlowGraphValues()
+
+
+def configure_incremental_recompute(script_config, mylog):
+    FLOW_GRAPH_VALUES.clear()
+    FLOW_GRAPH_VALUES.enabled = read_config_flag(script_config, 'Incremental_Recompute', False)
+    mylog.info('Incremental recompute: ' + str(FLOW_GRAPH_VALUES.enabled))
+
+
+def update_parameter_values(building_mfa_system, par_name, values):
+    check_stock_model_parameters(building_mfa_system.ParameterDict, [par_name], 'Parameter update')
+    parameter = building_mfa_system.ParameterDict[par_name]
+    par_values = np.array(dense_values(values), dtype=parameter.Values.dtype)
+    if isinstance(parameter.Values, SparseValues):
+        par_values = sparse_values(par_values)
+    parameter.Values = par_values
+
+
+def recalculate_scenarios(building_mfa_system, results_path, mylog, scenario_selection=SCENARIO_NAMES):
+    scenario_results = {}
+    for scenario_name in scenario_selection:
+        scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+        requested_flows = scenario_flow_keys(scenario_definition)
+        changed_flows = changed_flow_nodes(building_mfa_system.ParameterDict, scenario_definition, requested_flows,
+                                           FLOW_GRAPH_VALUES.scenario_values(scenario_name))
+        changed_flows = [key for key in requested_flows if key in changed_flows]
+        if len(changed_flows) == 0:
+            mylog.info('No changed flows for scenario ' + scenario_name)
+            continue
+        mylog.info('Recompute scenario ' + scenario_name + ': ' + ', '.join(changed_flows))
+        print('Recompute scenario ' + scenario_name + ': ' + ', '.join(changed_flows))
+        scenario_results[scenario_name] = solve_flow_graph(building_mfa_system, scenario_name, requested_flows)
+        SCENARIO_WRITERS[scenario_name](building_mfa_system, scenario_results[scenario_name], results_path, mylog)
+    return scenario_results
+
+
+SampledParameter = namedtuple('SampledParameter', 'Values')
+
+
+def monte_carlo_calculation(building_mfa_system, results_path, mylog, scenario_selection, script_config,
+                            sample_count):
+    mylog.info('Propagate parameter uncertainty with ' + str(sample_count) + ' Monte Carlo samples')
+    print('Propagate parameter uncertainty with ' + str(sample_count) + ' Monte Carlo samples')
+    memory_budget = float(read_config_option(script_config, 'Monte_Carlo_Memory', 1024)) * 1024 ** 2
+    seed = read_config_option(script_config, 'Monte_Carlo_Seed', None)
+    seed_entropy = np.random.SeedSequence(None if seed is None else int(seed)).entropy
+    report_rows = []
+    for scenario_name in scenario_selection:
+        scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+        requested_flows = scenario_flow_keys(scenario_definition)
+        node_values = {}
+        evaluate_flow_graph(building_mfa_system.ParameterDict, scenario_definition, requested_flows, node_values)
+        uncertainties = read_parameter_uncertainties(
+            building_mfa_system.ParameterDict, scenario_parameter_names(scenario_definition, requested_flows), mylog)
+        sampled_names = list(uncertainties)
+        check_stock_model_parameters(building_mfa_system.ParameterDict, sampled_names, 'Monte Carlo', mylog)
+        sample_factors = {par_name: sample_parameter_factors(uncertainties[par_name], sample_count,
+                                                             np.random.default_rng([seed_entropy,
+                                                                                    parameter_seed(par_name)]))
+                          for par_name in sampled_names}
+        chunk_size = sample_chunk_size(node_values, memory_budget, sample_count)
+        mylog.info('Monte Carlo samples for scenario ' + scenario_name + ' in chunks of ' + str(chunk_size) +
+                   '; uncertain parameters: ' + ', '.join(sampled_names))
+        flow_totals = {key: [] for key in requested_flows}
+        for chunk_start in range(0, sample_count, chunk_size):
+            chunk_samples = min(chunk_size, sample_count - chunk_start)
+            sampled_parameters = ChainMap({}, building_mfa_system.ParameterDict)
+            for par_name in sampled_names:
+                sampled_parameters[par_name] = SampledParameter(
+                    scale_parameter_values(building_mfa_system.ParameterDict[par_name].Values,
+                                           sample_factors[par_name][chunk_start:chunk_start + chunk_samples]))
+            sampled_flows = evaluate_sampled_flows(sampled_parameters, scenario_definition, requested_flows)
+            for key, values in sampled_flows.items():
+                values = dense_values(values)
+                if values.ndim == len(node_values[key].shape):
+                    values = values[np.newaxis]
+                totals = values.reshape(values.shape[0], -1, values.shape[-1]).sum(axis=1)
+                flow_totals[key].append(np.broadcast_to(totals, (chunk_samples, totals.shape[-1])))
+        time_items = building_mfa_system.IndexTable['Classification']['Time'].Items
+        for key in requested_flows:
+            totals = np.concatenate(flow_totals[key])
+            deterministic = dense_values(node_values[key]).reshape(-1, totals.shape[-1]).sum(axis=0)
+            percentiles = np.percentile(totals, [5, 50, 95], axis=0)
+            for ti in range(0, totals.shape[-1]):
+                report_rows.append([scenario_name, key, time_items[ti], deterministic[ti], totals[:, ti].mean(),
+                                    totals[:, ti].std(), percentiles[0, ti], percentiles[1, ti], percentiles[2, ti]])
+    monte_carlo_results = pd.DataFrame(report_rows, columns=['Scenario', 'Flow or stock', 'Time', 'Deterministic',
+                                                             'Mean', 'Standard deviation', 'P5', 'P50', 'P95'])
+    monte_carlo_results.to_csv(os.path.join(results_path, 'monte_carlo.csv'), index=False)
+
+
+def evaluate_sampled_flows(sampled_parameters, scenario_definition, requested_flows):
+    FLOW_CACHE.enabled = False
+    try:
+        return evaluate_flow_graph(sampled_parameters, scenario_definition, requested_flows)
+    finally:
+        FLOW_CACHE.enabled = True
+
+
+def sample_chunk_size(node_values, memory_budget, sample_count):
+    sample_bytes = sum(dense_values(values).nbytes for values in node_values.values() if values is not None)
+    return int(max(1, min(sample_count, memory_budget // max(sample_bytes, 1))))
+
+
+def read_parameter_uncertainties(parameter_dict, par_names, mylog):
+    uncertainties = {}
+    for par_name in dict.fromkeys(par_names):
+        uncertainty_spec = parameter_dict[par_name].Uncert
+        if uncertainty_spec is None:
+            continue
+        uncertainty = parse_uncertainty_spec(uncertainty_spec)
+        if uncertainty is None:
+            mylog.error('UNCERTAINTY ERROR: ' + uncertainty_spec + ' of parameter ' + par_name +
+                        ' is not supported, the parameter is kept fixed.')
+        elif uncertainty[0] != 1:
+            uncertainties[par_name] = uncertainty
+    return uncertainties
+
+
+def parse_uncertainty_spec(uncertainty_spec):
+    fields = [field.strip() for field in uncertainty_spec.split(';')] + [''] * 6
+    try:
+        distribution = int(float(fields[0]))
+        loc, scale, shape, minimum, maximum = [None if field == '' else float(field) for field in fields[1:6]]
+    except ValueError:
+        return None
+    if distribution not in (1, 2, 3, 4, 5):
+        return None
+    if distribution in (2, 3) and scale is None:
+        return None
+    if distribution == 2 and loc is not None and loc <= 0:
+        return None
+    if distribution in (4, 5) and (minimum is None or maximum is None):
+        return None
+    return distribution, loc, scale, shape, minimum, maximum
+
+
+def scenario_parameter_names(scenario_definition, requested_flows):
+    par_names = []
+    for node in flow_graph_order(requested_flows):
+        if 'parameter' in FLOW_GRAPH[node]:
+            par_name = scenario_parameter_name(FLOW_GRAPH[node]['parameter'], scenario_definition,
+                                               FLOW_GRAPH[node].get('mechanism'))
+            if par_name is not None:
+                par_names.append(par_name)
+    return par_names
+
+
+def parameter_seed(par_name):
+    return int(hashlib.sha256(par_name.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def sample_parameter_factors(uncertainty, sample_count, rng):
+    distribution, loc, scale, shape, minimum, maximum = uncertainty
+    mode = 1.0 if loc is None else loc
+    if distribution == 2:
+        factors = np.exp(rng.normal(np.log(mode), scale, sample_count))
+    elif distribution == 3:
+        factors = rng.normal(mode, scale, sample_count)
+    elif distribution == 4:
+        factors = rng.uniform(minimum, maximum, sample_count)
+    else:
+        factors = rng.triangular(minimum, min(max(mode, minimum), maximum), maximum, sample_count)
+    if minimum is not None or maximum is not None:
+        factors = np.clip(factors, minimum, maximum)
+    return factors
+
+
+def scale_parameter_values(values, factors):
+    values = dense_values(values)
+    return (factors.reshape((-1,) + (1,) * values.ndim) * values).astype(values.dtype)
+
+
+def sensitivity_calculation(building_mfa_system, results_path, mylog, scenario_selection, script_config,
+                            sensitivity_method):
+    if sensitivity_method not in ('morris', 'sobol'):
+        mylog.error('SENSITIVITY METHOD ERROR: ' + sensitivity_method + ' is not supported, use morris or sobol.')
+        return
+    factor_names = read_sensitivity_names(script_config, 'Sensitivity_Parameters', flow_parameter_names(), mylog)
+    output_flows = read_sensitivity_names(script_config, 'Sensitivity_Outputs',
+                                          ['Steel production', 'Clinker production'], mylog)
+    sample_count = int(read_config_option(script_config, 'Sensitivity_Samples', 100))
+    factor_range = float(read_config_option(script_config, 'Sensitivity_Range', 0.1))
+    memory_budget = float(read_config_option(script_config, 'Sensitivity_Memory', 1024)) * 1024 ** 2
+    sensitivity_workers = int(read_config_option(script_config, 'Sensitivity_Workers', 1))
+    seed = read_config_option(script_config, 'Sensitivity_Seed', None)
+    rng = np.random.default_rng(None if seed is None else int(seed))
+    if sensitivity_method == 'morris':
+        design, factor_order = morris_design(len(factor_names), sample_count, rng)
+    else:
+        design = saltelli_design(len(factor_names), sample_count, rng)
+    mylog.info('Sensitivity analysis (' + sensitivity_method + ') with ' + str(len(design)) + ' model evaluations '
+               'per scenario; parameters: ' + ', '.join(factor_names))
+    print('Sensitivity analysis (' + sensitivity_method + ') with ' + str(len(design)) + ' model evaluations '
+          'per scenario')
+    index_names = ['mu', 'mu_star', 'sigma'] if sensitivity_method == 'morris' else ['S1', 'ST']
+    multipliers = 1 - factor_range + 2 * factor_range * design
+    chunk_args = []
+    for scenario_name in scenario_selection:
+        scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+        check_stock_model_parameters(
+            building_mfa_system.ParameterDict,
+            [par_name for par_name in [scenario_parameter_name(factor_name, scenario_definition,
+                                                               flow_parameter_mechanism(factor_name))
+                                       for factor_name in factor_names] if par_name is not None],
+            'Sensitivity analysis', mylog)
+        node_values = {}
+        evaluate_flow_graph(building_mfa_system.ParameterDict, scenario_definition, output_flows, node_values)
+        output_ndims = {output_flow: dense_values(node_values[output_flow]).ndim for output_flow in output_flows
+                        if node_values[output_flow] is not None}
+        chunk_size = sample_chunk_size(node_values, memory_budget, len(design))
+        for chunk_start in range(0, len(design), chunk_size):
+            chunk_args.append((scenario_name, factor_names, output_ndims,
+                               multipliers[chunk_start:chunk_start + chunk_size]))
+    chunk_outputs = run_sensitivity_chunks(building_mfa_system, mylog, chunk_args, sensitivity_workers)
+    region_items = building_mfa_system.IndexTable['Classification']['Region'].Items
+    report_rows = []
+    for scenario_name in scenario_selection:
+        scenario_outputs = [chunk_outputs[ci] for ci in range(0, len(chunk_args)) if chunk_args[ci][0] == scenario_name]
+        for output_flow in output_flows:
+            if output_flow not in scenario_outputs[0]:
+                continue
+            outputs = np.concatenate([chunk_output[output_flow] for chunk_output in scenario_outputs])
+            if sensitivity_method == 'morris':
+                indices = morris_indices(outputs, design, factor_order)
+            else:
+                indices = sobol_indices(outputs, len(factor_names))
+            for fi in range(0, len(factor_names)):
+                for ri in range(0, outputs.shape[1]):
+                    report_rows.append([scenario_name, output_flow, region_items[ri], factor_names[fi]] +
+                                       [indices[index_name][fi, ri] for index_name in index_names])
+    sensitivity_results = pd.DataFrame(report_rows, columns=['Scenario', 'Flow or stock', 'Region', 'Parameter'] +
+                                       index_names)
+    sensitivity_results.to_csv(os.path.join(results_path, 'sensitivity_' + sensitivity_method + '.csv'), index=False)
+
+
+def flow_parameter_names():
+    return [flow_node['parameter'] for flow_node in FLOW_GRAPH.values() if 'parameter' in flow_node]
+
+
+def flow_parameter_mechanism(par_name):
+    for flow_node in FLOW_GRAPH.values():
+        if flow_node.get('parameter') == par_name:
+            return flow_node.get('mechanism')
+    return None
+
+
+def read_sensitivity_names(script_config, key, default_names, mylog):
+    names = read_config_option(script_config, key, None)
+    if names is None:
+        return default_names
+    names = [name.strip() for name in str(names).split(',') if name.strip() != '']
+    known_names = flow_parameter_names() if key == 'Sensitivity_Parameters' else list(FLOW_GRAPH)
+    for name in names:
+        if name not in known_names:
+            mylog.error('SENSITIVITY ERROR: ' + key + ' contains the unknown entry ' + name)
+    return [name for name in names if name in known_names]
+
+
+def morris_design(factor_count, trajectory_count, rng, levels=4):
+    delta = levels / (2.0 * (levels - 1))
+    design = np.zeros((trajectory_count, factor_count + 1, factor_count))
+    factor_order = np.zeros((trajectory_count, factor_count), dtype=int)
+    for tr in range(0, trajectory_count):
+        design[tr, 0] = rng.integers(0, levels, factor_count) / (levels - 1)
+        factor_order[tr] = rng.permutation(factor_count)
+        for step in range(0, factor_count):
+            fi = factor_order[tr, step]
+            design[tr, step + 1] = design[tr, step]
+            design[tr, step + 1, fi] += delta if design[tr, step, fi] + delta <= 1 else -delta
+    return design.reshape(-1, factor_count), factor_order
+
+
+def morris_indices(outputs, design, factor_order):
+    trajectory_count, factor_count = factor_order.shape
+    outputs = outputs.reshape(trajectory_count, factor_count + 1, -1)
+    design = design.reshape(trajectory_count, factor_count + 1, factor_count)
+    trajectories = np.arange(trajectory_count)
+    effects = np.zeros((trajectory_count, factor_count, outputs.shape[-1]))
+    for step in range(0, factor_count):
+        fi = factor_order[:, step]
+        factor_step = design[trajectories, step + 1, fi] - design[trajectories, step, fi]
+        effects[trajectories, fi] = (outputs[:, step + 1] - outputs[:, step]) / factor_step[:, np.newaxis]
+    return {'mu': effects.mean(axis=0), 'mu_star': np.abs(effects).mean(axis=0), 'sigma': effects.std(axis=0)}
+
+
+def saltelli_design(factor_count, sample_count, rng):
+    matrix_a = rng.random((sample_count, factor_count))
+    matrix_b = rng.random((sample_count, factor_count))
+    design = [matrix_a, matrix_b]
+    for fi in range(0, factor_count):
+        matrix_ab = matrix_a.copy()
+        matrix_ab[:, fi] = matrix_b[:, fi]
+        design.append(matrix_ab)
+    return np.concatenate(design)
+
+
+def sobol_indices(outputs, factor_count):
+    outputs = outputs.reshape(factor_count + 2, -1, outputs.shape[-1])
+    outputs_a, outputs_b, outputs_ab = outputs[0], outputs[1], outputs[2:]
+    variance = np.concatenate((outputs_a, outputs_b)).var(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_order = (variance - 0.5 * ((outputs_b - outputs_ab) ** 2).mean(axis=1)) / variance
+        total_order = 0.5 * ((outputs_a - outputs_ab) ** 2).mean(axis=1) / variance
+    return {'S1': first_order, 'ST': total_order}
+
+
+def run_sensitivity_chunks(building_mfa_system, mylog, chunk_args, sensitivity_workers):
+    if sensitivity_workers <= 1:
+        return [evaluate_sensitivity_chunk(building_mfa_system.ParameterDict, chunk_arg) for chunk_arg in chunk_args]
+    if 'fork' in multiprocessing.get_all_start_methods():
+        sensitivity_context = multiprocessing.get_context('fork')
+    else:
+        sensitivity_context = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=sensitivity_workers, mp_context=sensitivity_context,
+                             initializer=initialize_scenario_worker,
+                             initargs=(building_mfa_system, None, mylog)) as sensitivity_pool:
+        return list(sensitivity_pool.map(run_sensitivity_chunk, chunk_args))
+
+
+def run_sensitivity_chunk(chunk_arg):
+    return evaluate_sensitivity_chunk(SCENARIO_WORKER_STATE['building_mfa_system'].ParameterDict, chunk_arg)
+
+
+def evaluate_sensitivity_chunk(parameter_dict, chunk_arg):
+    scenario_name, factor_names, output_ndims, multipliers = chunk_arg
+    scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+    sampled_parameters = ChainMap({}, parameter_dict)
+    for fi in range(0, len(factor_names)):
+        par_name = scenario_parameter_name(factor_names[fi], scenario_definition,
+                                           flow_parameter_mechanism(factor_names[fi]))
+        if par_name is None:
+            continue
+        par_values = dense_values(parameter_dict[par_name].Values)
+        sampled_parameters[par_name] = SampledParameter(
+            (multipliers[:, fi].reshape((-1,) + (1,) * par_values.ndim) * par_values).astype(par_values.dtype))
+    sampled_flows = evaluate_sampled_flows(sampled_parameters, scenario_definition, list(output_ndims))
+    chunk_outputs = {}
+    for output_flow, output_ndim in output_ndims.items():
+        values = dense_values(sampled_flows[output_flow])
+        if values.ndim == output_ndim:
+            values = values[np.newaxis]
+        values = values.reshape(values.shape[0], values.shape[1], -1).sum(axis=2)
+        chunk_outputs[output_flow] = np.broadcast_to(values, (len(multipliers), values.shape[1]))
+    return chunk_outputs
+
+
+ACTIVITY_FLOWS = ['Construction of buildings', 'Building stock', 'Demolition of buildings']
+FLOW_OPERATORS = {}
+
+
+class FlowOperators:
+    def __init__(self, scenario_name, parameter_values, flow_values, activity_values, activity_operators,
+                 lever_coefficients):
+        self.scenario_name = scenario_name
+        self.parameter_values = parameter_values
+        self.flow_values = flow_values
+        self.activity_values = activity_values
+        self.activity_operators = activity_operators
+        self.lever_coefficients = lever_coefficients
+
+    def activity_response(self, flow_key, activity_values):
+        flow_values = np.zeros_like(self.flow_values[flow_key])
+        for activity, operator in self.activity_operators[flow_key].items():
+            building_values = dense_values(activity_values.get(activity, self.activity_values[activity]))
+            flow_values += np.einsum('bar...t, rbat ->r...t', operator, building_values)
+        return flow_values
+
+    def lever_response(self, flow_key, lever, lever_scale):
+        if flow_key not in self.lever_coefficients[lever]:
+            return self.flow_values[flow_key]
+        constant, linear, quadratic = self.lever_coefficients[lever][flow_key]
+        return constant + lever_scale * (linear + lever_scale * quadratic)
+
+
+def flow_operators(building_mfa_system, scenario_name, levers=(), memory_budget=1024 ** 3, mylog=None):
+    parameter_dict = building_mfa_system.ParameterDict
+    scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+    output_flows = [key for key in scenario_flow_keys(scenario_definition)
+                    if key not in ACTIVITY_FLOWS and key != 'Building stock change' and regional_flow(key)]
+    parameter_values = [parameter_dict[par_name].Values for par_name in
+                        scenario_parameter_names(scenario_definition, output_flows)]
+    operators = FLOW_OPERATORS.get(scenario_name)
+    if operators is not None and set(levers) <= set(operators.lever_coefficients) and \
+            all(values is cached for values, cached in zip(parameter_values, operators.parameter_values)):
+        return operators
+    node_values = {}
+    flow_values = evaluate_flow_graph(parameter_dict, scenario_definition, output_flows, node_values)
+    activity_values = {activity: node_values[activity] for activity in ACTIVITY_FLOWS
+                       if node_values.get(activity) is not None}
+    check_stock_model_parameters(parameter_dict, [scenario_parameter_name(FLOW_GRAPH[activity]['parameter'],
+                                                                          scenario_definition,
+                                                                          FLOW_GRAPH[activity]['mechanism'])
+                                                  for activity in activity_values], 'Flow operators', mylog)
+    activity_operators = {flow_key: {} for flow_key in output_flows}
+    for activity, building_values in activity_values.items():
+        building_shape = building_values.shape
+        unit_count = building_shape[1] * building_shape[2]
+        unit_activity = np.eye(unit_count, dtype=building_values.dtype).reshape(
+            (unit_count, 1) + building_shape[1:3] + (1,))
+        chunk_size = sample_chunk_size(node_values, memory_budget, unit_count)
+        unit_flows = {flow_key: [] for flow_key in output_flows}
+        for chunk_start in range(0, unit_count, chunk_size):
+            chunk_activity = unit_activity[chunk_start:chunk_start + chunk_size]
+            sampled_parameters = ChainMap({}, parameter_dict)
+            for activity_node in activity_values:
+                par_name = scenario_parameter_name(FLOW_GRAPH[activity_node]['parameter'], scenario_definition,
+                                                   FLOW_GRAPH[activity_node]['mechanism'])
+                if activity_node == activity:
+                    par_values = np.broadcast_to(chunk_activity, (len(chunk_activity),) + building_shape)
+                else:
+                    par_values = np.broadcast_to(np.zeros(1, dtype=building_values.dtype), building_shape)
+                sampled_parameters[par_name] = SampledParameter(par_values)
+            sampled_flows = evaluate_sampled_flows(sampled_parameters, scenario_definition, output_flows)
+            for flow_key in output_flows:
+                if sampled_flows[flow_key].ndim > flow_values[flow_key].ndim:
+                    unit_flows[flow_key].append(sampled_flows[flow_key])
+        for flow_key in output_flows:
+            if len(unit_flows[flow_key]) > 0:
+                activity_operators[flow_key][activity] = np.concatenate(unit_flows[flow_key]).reshape(
+                    building_shape[1:3] + flow_values[flow_key].shape)
+    lever_coefficients = {}
+    for lever in levers:
+        lever_coefficients[lever] = fit_lever_response(parameter_dict, scenario_definition, flow_values, lever, mylog)
+    operators = FlowOperators(scenario_name, parameter_values, flow_values, activity_values, activity_operators,
+                              lever_coefficients)
+    FLOW_OPERATORS[scenario_name] = operators
+    return operators
+
+
+def fit_lever_response(parameter_dict, scenario_definition, flow_values, lever, mylog):
+    par_name = scenario_parameter_name(lever, scenario_definition, flow_parameter_mechanism(lever))
+    if par_name is None:
+        return {}
+    par_values = dense_values(parameter_dict[par_name].Values)
+    lever_scales = np.arange(4, dtype=par_values.dtype)
+    sampled_parameters = ChainMap({}, parameter_dict)
+    sampled_parameters[par_name] = SampledParameter(lever_scales.reshape((-1,) + (1,) * par_values.ndim) * par_values)
+    sampled_flows = evaluate_sampled_flows(sampled_parameters, scenario_definition, list(flow_values))
+    coefficients = {}
+    for flow_key, values in sampled_flows.items():
+        if values.ndim == flow_values[flow_key].ndim:
+            continue
+        quadratic = (values[2] - 2 * values[1] + values[0]) / 2
+        linear = values[1] - values[0] - quadratic
+        fit_deviation = np.abs(values[0] + 3 * linear + 9 * quadratic - values[3]).max()
+        if mylog is not None and fit_deviation > 1e-6 * max(float(np.abs(values[3]).max()), 1.0):
+            mylog.warning('LEVER FIT WARNING: ' + flow_key + ' is not quadratic in ' + lever)
+        coefficients[flow_key] = (values[0], linear, quadratic)
+    return coefficients
+
+
 def reference_calculation(building_mfa_system, results_path, mylog):
-    solve_mfa_reference(building_mfa_system, mylog)
-    write_results_excel_reference(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_reference(building_mfa_system, mylog)
+    write_results_excel_reference(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_reference(building_mfa_system, mylog):
     mylog.info('Solve MFA for reference case')
     print('Solve MFA for reference case')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.FlowDict['Steel inflow, building types'].Values = \
-        np.einsum('rbaf, rbat->bt',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow, building types'].Values = \
-        np.einsum('rbao, rbat ->bt',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_reference(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'reference')
+
+
+def write_results_excel_reference(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for reference case')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for reference case')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_in_ty', building_mfa_system.FlowDict['Steel inflow, building types'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in_ty', scenario_result.values('Steel inflow, building types'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['BuildingType'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_in_ty', building_mfa_system.FlowDict['Concrete inflow, building types'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in_ty', scenario_result.values('Concrete inflow, building types'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['BuildingType'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/reference.xls')
 
 
-def ce_action_calculation(building_mfa_system, results_path, mylog):
-    calc_timber_construction(building_mfa_system, results_path, mylog)
-    calc_reduced_space(building_mfa_system, results_path, mylog)
-    calc_reduced_overspec(building_mfa_system, results_path, mylog)
-    calc_cult_herit(building_mfa_system, results_path, mylog)
-    calc_renovation(building_mfa_system, results_path, mylog)
-    calc_reuse_elements(building_mfa_system, results_path, mylog)
-    calc_reuse_steel(building_mfa_system, results_path, mylog)
-    calc_rec_cement(building_mfa_system, results_path, mylog)
+def ce_action_calculation(building_mfa_system, results_path, mylog, scenario_selection=SCENARIO_NAMES):
+    ce_actions = [('timber_construction', calc_timber_construction),
+                  ('reduced_space', calc_reduced_space),
+                  ('reduced_overspec', calc_reduced_overspec),
+                  ('cult_herit', calc_cult_herit),
+                  ('renovation', calc_renovation),
+                  ('reuse_elements', calc_reuse_elements),
+                  ('reuse_steel', calc_reuse_steel),
+                  ('rec_cement', calc_rec_cement)]
+    for scenario_name, calc_ce_action in ce_actions:
+        if scenario_name in scenario_selection:
+            calc_ce_action(building_mfa_system, results_path, mylog)
 
 
 def calc_timber_construction(building_mfa_system, results_path, mylog):
-    solve_mfa_timber_construction(building_mfa_system, mylog)
-    write_results_excel_timber_construction(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_timber_construction(building_mfa_system, mylog)
+    write_results_excel_timber_construction(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_timber_construction(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to timber construction')
     print('Calculate reduced material demand due to timber construction')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_timber'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_timber'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_timber'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_timber'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_timber'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_timber'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_timber_construction(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'timber_construction')
+
+
+def write_results_excel_timber_construction(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (timber construction)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (timber construction)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
 
@@ -568,143 +2366,58 @@ def write_results_excel_timber_construction(building_mfa_system, results_path, m
 
 
 def calc_reduced_space(building_mfa_system, results_path, mylog):
-    solve_mfa_reduced_space(building_mfa_system, mylog)
-    write_results_excel_reduced_space(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_reduced_space(building_mfa_system, mylog)
+    write_results_excel_reduced_space(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_reduced_space(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to reduced floor space demand')
     print('Calculate reduced material demand due to reduced floor space demand')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow_reduced'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock_reduced'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow_reduced'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_reduced_space(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'reduced_space')
+
+
+def write_results_excel_reduced_space(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (reduced floor space)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (reduced floor space)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
 
@@ -712,1469 +2425,936 @@ def write_results_excel_reduced_space(building_mfa_system, results_path, mylog):
 
 
 def calc_reduced_overspec(building_mfa_system, results_path, mylog):
-    solve_mfa_reduced_overspec(building_mfa_system, mylog)
-    write_results_excel_reduced_overspec(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_reduced_overspec(building_mfa_system, mylog)
+    write_results_excel_reduced_overspec(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_reduced_overspec(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to reduced over-specification')
     print('Calculate reduced material demand due to reduced over-specification')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_overspec'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_overspec'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_overspec'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_overspec'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_overspec'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_overspec'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_reduced_overspec(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'reduced_overspec')
+
+
+def write_results_excel_reduced_overspec(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (reduced over-specification)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (reduced over-specification)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_reducedoverspec.xls')
 
 
 def calc_cult_herit(building_mfa_system, results_path, mylog):
-    solve_mfa_cult_herit(building_mfa_system, mylog)
-    write_results_excel_cult_herit(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_cult_herit(building_mfa_system, mylog)
+    write_results_excel_cult_herit(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_cult_herit(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to protection of cultural heritage buildings')
     print('Calculate reduced material demand due to protection of cultural heritage buildings')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow_cult'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock_cult'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow_cult'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_cult_herit(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'cult_herit')
+
+
+def write_results_excel_cult_herit(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (cultural heritage)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (cultural heritage)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_culturalheritage.xls')
 
 
 def calc_renovation(building_mfa_system, results_path, mylog):
-    solve_mfa_renovation(building_mfa_system, mylog)
-    write_results_excel_renovation(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_renovation(building_mfa_system, mylog)
+    write_results_excel_renovation(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_renovation(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to renovation')
     print('Calculate reduced material demand due to renovation')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow_renov'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock_renov'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow_renov'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_renovation(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'renovation')
+
+
+def write_results_excel_renovation(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (renovation)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (renovation)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_renovation.xls')
 
 
 def calc_reuse_elements(building_mfa_system, results_path, mylog):
-    solve_mfa_reuse_elements(building_mfa_system, mylog)
-    write_results_excel_reuse_elements(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_reuse_elements(building_mfa_system, mylog)
+    write_results_excel_reuse_elements(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_reuse_elements(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to reuse of building elements')
     print('Calculate reduced material demand due to reuse of building elements')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft, rft -> rft',
-                  building_mfa_system.ParameterDict['par_steel_element_reuse'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-        building_mfa_system.FlowDict['Reuse of steel element'].Values
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot, rot -> rot',
-                  building_mfa_system.ParameterDict['par_concrete_element_reuse'].Values,
-                  building_mfa_system.FlowDict['Concrete outflow'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        building_mfa_system.FlowDict['Concrete inflow'].Values + \
-        building_mfa_system.FlowDict['Reuse of concrete element'].Values
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_reuse_elements(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'reuse_elements')
+
+
+def write_results_excel_reuse_elements(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (reuse of elements)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (reuse of elements)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values)
-    msf.ExcelSheetFill(results_file, 'S_el_re', building_mfa_system.FlowDict['Reuse of steel element'].Values,
+    msf.ExcelSheetFill(results_file, 'S_el_re', scenario_result.aggregate('Reuse of steel element', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values)
-    msf.ExcelSheetFill(results_file, 'C_el_re', building_mfa_system.FlowDict['Reuse of concrete element'].Values,
+    msf.ExcelSheetFill(results_file, 'C_el_re', scenario_result.aggregate('Reuse of concrete element', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_reuseelements.xls')
 
 
 def calc_reuse_steel(building_mfa_system, results_path, mylog):
-    solve_mfa_reuse_steel(building_mfa_system, mylog)
-    write_results_excel_reuse_steel(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_reuse_steel(building_mfa_system, mylog)
+    write_results_excel_reuse_steel(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_reuse_steel(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to reuse of structural steel')
     print('Calculate reduced material demand due to reuse of structural steel')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft, rft -> rft', building_mfa_system.ParameterDict['par_steel_reuse'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-        building_mfa_system.FlowDict['Reuse of steel'].Values
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_reuse_steel(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'reuse_steel')
+
+
+def write_results_excel_reuse_steel(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (reuse of steel)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (reuse of steel)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values)
-    msf.ExcelSheetFill(results_file, 'S_reu', building_mfa_system.FlowDict['Reuse of steel'].Values,
+    msf.ExcelSheetFill(results_file, 'S_reu', scenario_result.aggregate('Reuse of steel', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_reusesteel.xls')
 
 
 def calc_rec_cement(building_mfa_system, results_path, mylog):
-    solve_mfa_rec_cement(building_mfa_system, mylog)
-    write_results_excel_rec_cement(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_rec_cement(building_mfa_system, mylog)
+    write_results_excel_rec_cement(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_rec_cement(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to cement recycling')
     print('Calculate reduced material demand due to cement recycling')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Cement recycling'].Values = \
-        np.einsum('romt, rot -> rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_cement_recycling'].Values,
-                            np.einsum('rot, rot ->rot',
-                                      building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                                      (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                                       building_mfa_system.FlowDict['Concrete reuse'].Values))))
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        building_mfa_system.FlowDict['Cement production'].Values + \
-        building_mfa_system.FlowDict['Cement recycling'].Values
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values) - \
-        np.einsum('rot, rot ->rt', building_mfa_system.ParameterDict['par_cement_recycling'].Values,
-                  (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                   building_mfa_system.FlowDict['Concrete reuse'].Values))
-
-
-def write_results_excel_rec_cement(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'rec_cement')
+
+
+def write_results_excel_rec_cement(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE case (cement recycling)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE case (cement recycling)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_rec', building_mfa_system.FlowDict['Cement recycling'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'C_rec', scenario_result.values('Cement recycling')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_cementrecycling.xls')
 
 
-def ce_bundle_calculation(building_mfa_system, results_path, mylog):
-    calc_bundle_lifestyle(building_mfa_system, results_path, mylog)
-    calc_bundle_construction(building_mfa_system, results_path, mylog)
-    calc_bundle_midway(building_mfa_system, results_path, mylog)
+def ce_bundle_calculation(building_mfa_system, results_path, mylog, scenario_selection=SCENARIO_NAMES):
+    ce_bundles = [('bundle_lifestyle', calc_bundle_lifestyle),
+                  ('bundle_construction', calc_bundle_construction),
+                  ('bundle_midway', calc_bundle_midway)]
+    for scenario_name, calc_ce_bundle in ce_bundles:
+        if scenario_name in scenario_selection:
+            calc_ce_bundle(building_mfa_system, results_path, mylog)
 
 
 def calc_bundle_lifestyle(building_mfa_system, results_path, mylog):
-    solve_mfa_bundle_lifestyle(building_mfa_system, mylog)
-    write_results_excel_bundle_lifestyle(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_bundle_lifestyle(building_mfa_system, mylog)
+    write_results_excel_bundle_lifestyle(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_bundle_lifestyle(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to CE bundle affecting lifestyle')
     print('Calculate reduced material demand due to CE bundle affecting lifestyle')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow_lifestyle'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock_lifestyle'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow_lifestyle'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_lifestyle'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_lifestyle'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_lifestyle'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_lifestyle'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_lifestyle'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_lifestyle'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values)
-
-
-def write_results_excel_bundle_lifestyle(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'bundle_lifestyle')
+
+
+def write_results_excel_bundle_lifestyle(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE bundle (lifestyle)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE bundle (lifestyle)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_ lifestyle.xls')
 
 
 def calc_bundle_construction(building_mfa_system, results_path, mylog):
-    solve_mfa_bundle_construction(building_mfa_system, mylog)
-    write_results_excel_bundle_construction(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_bundle_construction(building_mfa_system, mylog)
+    write_results_excel_bundle_construction(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_bundle_construction(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to CE bundle affecting construction')
     print('Calculate reduced material demand due to CE bundle affecting construction')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_construction'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_construction'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_construction'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_construction'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_construction'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_construction'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft, rft -> rft',
-                  building_mfa_system.ParameterDict['par_steel_element_reuse'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-                                                          building_mfa_system.FlowDict['Reuse of steel element'].Values
-    building_mfa_system.FlowDict['Steel outflow'].Values = building_mfa_system.FlowDict['Steel outflow'].Values - \
-                                                           building_mfa_system.FlowDict['Reuse of steel element'].Values
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft, rft -> rft', building_mfa_system.ParameterDict['par_steel_reuse'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-                                                          building_mfa_system.FlowDict['Reuse of steel'].Values
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot, rot -> rot',
-                  building_mfa_system.ParameterDict['par_concrete_element_reuse'].Values,
-                  building_mfa_system.FlowDict['Concrete outflow'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        building_mfa_system.FlowDict['Concrete inflow'].Values + \
-        building_mfa_system.FlowDict['Reuse of concrete element'].Values
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        building_mfa_system.FlowDict['Concrete outflow'].Values - \
-        building_mfa_system.FlowDict['Reuse of concrete element'].Values
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Cement recycling'].Values = \
-        np.einsum('romt, rot -> rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_cement_recycling'].Values,
-                            np.einsum('rot, rot ->rot',
-                                      building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                                      (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                                       building_mfa_system.FlowDict['Concrete reuse'].Values))))
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        building_mfa_system.FlowDict['Cement production'].Values + \
-        building_mfa_system.FlowDict['Cement recycling'].Values
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values) - \
-        np.einsum('rot, rot ->rt', building_mfa_system.ParameterDict['par_cement_recycling'].Values,
-                  (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                   building_mfa_system.FlowDict['Concrete reuse'].Values))
-
-
-def write_results_excel_bundle_construction(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'bundle_construction')
+
+
+def write_results_excel_bundle_construction(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE bundle (construction)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE bundle (construction)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values)
-    msf.ExcelSheetFill(results_file, 'S_el_re', building_mfa_system.FlowDict['Reuse of steel element'].Values,
+    msf.ExcelSheetFill(results_file, 'S_el_re', scenario_result.aggregate('Reuse of steel element', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values)
-    msf.ExcelSheetFill(results_file, 'S_reu', building_mfa_system.FlowDict['Reuse of steel'].Values,
+    msf.ExcelSheetFill(results_file, 'S_reu', scenario_result.aggregate('Reuse of steel', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values)
-    msf.ExcelSheetFill(results_file, 'C_el_re', building_mfa_system.FlowDict['Reuse of concrete element'].Values,
+    msf.ExcelSheetFill(results_file, 'C_el_re', scenario_result.aggregate('Reuse of concrete element', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_rec', building_mfa_system.FlowDict['Cement recycling'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'C_rec', scenario_result.values('Cement recycling')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_construction.xls')
 
 
 def calc_bundle_midway(building_mfa_system, results_path, mylog):
-    solve_mfa_bundle_midway(building_mfa_system, mylog)
-    write_results_excel_bundle_midway(building_mfa_system, results_path, mylog)
+    scenario_result = solve_mfa_bundle_midway(building_mfa_system, mylog)
+    write_results_excel_bundle_midway(building_mfa_system, scenario_result, results_path, mylog)
 
 
 def solve_mfa_bundle_midway(building_mfa_system, mylog):
     mylog.info('Calculate reduced material demand due to "Midway" CE bundle')
     print('Calculate reduced material demand due to "Midway" CE bundle')
-    building_mfa_system.FlowDict['Construction of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_inflow_midway'].Values
-    building_mfa_system.StockDict['Building stock'].Values = \
-        building_mfa_system.ParameterDict['par_building_stock_midway'].Values
-    building_mfa_system.FlowDict['Demolition of buildings'].Values = \
-        building_mfa_system.ParameterDict['par_building_outflow_midway'].Values
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rbaf, rbat->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_midway'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_midway'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rbaf, rbat ->rft',
-                  building_mfa_system.ParameterDict['par_mi_steel_midway'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_midway'].Values,
-                  building_mfa_system.FlowDict['Construction of buildings'].Values)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_midway'].Values,
-                  building_mfa_system.StockDict['Building stock'].Values)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        np.einsum('rbao, rbat ->rot',
-                  building_mfa_system.ParameterDict['par_mi_concrete_midway'].Values,
-                  building_mfa_system.FlowDict['Demolition of buildings'].Values)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft, rft -> rft',
-                  building_mfa_system.ParameterDict['par_steel_element_reuse_midway'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-                                                          building_mfa_system.FlowDict['Reuse of steel element'].Values
-    building_mfa_system.FlowDict['Steel outflow'].Values = building_mfa_system.FlowDict['Steel outflow'].Values - \
-                                                           building_mfa_system.FlowDict['Reuse of steel element'].Values
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft, rft -> rft', building_mfa_system.ParameterDict['par_steel_reuse_midway'].Values,
-                  building_mfa_system.FlowDict['Steel outflow'].Values)
-    building_mfa_system.FlowDict['Steel inflow'].Values = building_mfa_system.FlowDict['Steel inflow'].Values + \
-                                                          building_mfa_system.FlowDict['Reuse of steel'].Values
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rfst, rft ->rst',
-                  building_mfa_system.ParameterDict['par_steel_process'].Values,
-                  np.einsum('rft, rft->rft',
-                            building_mfa_system.ParameterDict['par_finished_losses'].Values,
-                            building_mfa_system.FlowDict['Steel inflow'].Values))
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst, rst ->rst',
-                  building_mfa_system.ParameterDict['par_steel_recycling'].Values,
-                  np.einsum('rst,  rst ->rst',
-                            building_mfa_system.FlowDict['Steel production'].Values,
-                            building_mfa_system.ParameterDict['par_steel_losses'].Values))
-    building_mfa_system.FlowDict['Scrap other use'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values) - \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values) + \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values) - \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot, rot -> rot',
-                  building_mfa_system.ParameterDict['par_concrete_element_reuse_midway'].Values,
-                  building_mfa_system.FlowDict['Concrete outflow'].Values)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = \
-        building_mfa_system.FlowDict['Concrete inflow'].Values + \
-        building_mfa_system.FlowDict['Reuse of concrete element'].Values
-    building_mfa_system.FlowDict['Concrete outflow'].Values = \
-        building_mfa_system.FlowDict['Concrete outflow'].Values - \
-        building_mfa_system.FlowDict['Reuse of concrete element'].Values
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        np.einsum('romt, rot ->rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Concrete reuse'].Values = \
-        np.einsum('rot, rot ->rot',
-                  building_mfa_system.ParameterDict['par_concrete_reuse'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                            building_mfa_system.FlowDict['Concrete inflow'].Values))
-    building_mfa_system.FlowDict['Cement recycling'].Values = \
-        np.einsum('romt, rot -> rmt',
-                  building_mfa_system.ParameterDict['par_cement_process'].Values,
-                  np.einsum('rot, rot ->rot',
-                            building_mfa_system.ParameterDict['par_cement_recycling_midway'].Values,
-                            np.einsum('rot, rot ->rot',
-                                      building_mfa_system.ParameterDict['par_concrete_losses'].Values,
-                                      (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                                       building_mfa_system.FlowDict['Concrete reuse'].Values))))
-    building_mfa_system.FlowDict['Cement production'].Values = \
-        building_mfa_system.FlowDict['Cement production'].Values + \
-        building_mfa_system.FlowDict['Cement recycling'].Values
-    building_mfa_system.FlowDict['Clinker production'].Values = \
-        np.einsum('rmlt, rmt ->rlt',
-                  building_mfa_system.ParameterDict['par_clinker_process'].Values,
-                  np.einsum('rmt, rmt ->rmt',
-                            building_mfa_system.ParameterDict['par_cement_losses'].Values,
-                            building_mfa_system.FlowDict['Cement production'].Values))
-    building_mfa_system.FlowDict['Concrete landfill'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete outflow'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values) + \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Concrete reuse'].Values) - \
-        np.einsum('rot, rot ->rt', building_mfa_system.ParameterDict['par_cement_recycling_midway'].Values,
-                  (building_mfa_system.FlowDict['Concrete outflow'].Values +
-                   building_mfa_system.FlowDict['Concrete reuse'].Values))
-
-
-def write_results_excel_bundle_midway(building_mfa_system, results_path, mylog):
+    return solve_flow_graph(building_mfa_system, 'bundle_midway')
+
+
+def write_results_excel_bundle_midway(building_mfa_system, scenario_result, results_path, mylog):
     mylog.info('Export results to EXCEL for CE bundle (midway)')
     results_file = xlwt.Workbook()
     print('Export results to EXCEL for CE bundle (midway)')
-    building_mfa_system.FlowDict['Steel inflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_in', building_mfa_system.FlowDict['Steel inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_in', scenario_result.aggregate('Steel inflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Steel stock in buildings'].Values = \
-        np.einsum('rft->rt', building_mfa_system.StockDict['Steel stock in buildings'].Values)
     msf.ExcelSheetFill(results_file, 'S_stock',
-                       building_mfa_system.StockDict['Steel stock in buildings'].Values,
+                       scenario_result.aggregate('Steel stock in buildings', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel outflow'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Steel outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'S_out', building_mfa_system.FlowDict['Steel outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'S_out', scenario_result.aggregate('Steel outflow', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel element'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel element'].Values)
-    msf.ExcelSheetFill(results_file, 'S_el_re', building_mfa_system.FlowDict['Reuse of steel element'].Values,
+    msf.ExcelSheetFill(results_file, 'S_el_re', scenario_result.aggregate('Reuse of steel element', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of steel'].Values = \
-        np.einsum('rft->rt', building_mfa_system.FlowDict['Reuse of steel'].Values)
-    msf.ExcelSheetFill(results_file, 'S_reu', building_mfa_system.FlowDict['Reuse of steel'].Values,
+    msf.ExcelSheetFill(results_file, 'S_reu', scenario_result.aggregate('Reuse of steel', 'rft->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Steel production'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Steel production'].Values)
-    msf.ExcelSheetFill(results_file, 'S_prod', building_mfa_system.FlowDict['Steel production'].Values,
+    msf.ExcelSheetFill(results_file, 'S_prod', scenario_result.aggregate('Steel production', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Scrap recycling'].Values = \
-        np.einsum('rst->rt', building_mfa_system.FlowDict['Scrap recycling'].Values)
-    msf.ExcelSheetFill(results_file, 'S_rec', building_mfa_system.FlowDict['Scrap recycling'].Values,
+    msf.ExcelSheetFill(results_file, 'S_rec', scenario_result.aggregate('Scrap recycling', 'rst->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'S_oth', building_mfa_system.FlowDict['Scrap other use'].Values,
+    msf.ExcelSheetFill(results_file, 'S_oth', scenario_result.values('Scrap other use'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete inflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete inflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_in', building_mfa_system.FlowDict['Concrete inflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_in', scenario_result.aggregate('Concrete inflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.StockDict['Concrete stock in buildings'].Values = \
-        np.einsum('rot->rt', building_mfa_system.StockDict['Concrete stock in buildings'].Values)
-    msf.ExcelSheetFill(results_file, 'C_stock', building_mfa_system.StockDict['Concrete stock in buildings'].Values,
+    msf.ExcelSheetFill(results_file, 'C_stock', scenario_result.aggregate('Concrete stock in buildings', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete outflow'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete outflow'].Values)
-    msf.ExcelSheetFill(results_file, 'C_out', building_mfa_system.FlowDict['Concrete outflow'].Values,
+    msf.ExcelSheetFill(results_file, 'C_out', scenario_result.aggregate('Concrete outflow', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Reuse of concrete element'].Values = \
-        np.einsum('rot->rt', building_mfa_system.FlowDict['Reuse of concrete element'].Values)
-    msf.ExcelSheetFill(results_file, 'C_el_re', building_mfa_system.FlowDict['Reuse of concrete element'].Values,
+    msf.ExcelSheetFill(results_file, 'C_el_re', scenario_result.aggregate('Reuse of concrete element', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CE_prod', building_mfa_system.FlowDict['Cement production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CE_prod', scenario_result.values('Cement production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'CL_prod', building_mfa_system.FlowDict['Clinker production'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'CL_prod', scenario_result.values('Clinker production')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    building_mfa_system.FlowDict['Concrete reuse'].Values = np.einsum('rot->rt', building_mfa_system.FlowDict[
-        'Concrete reuse'].Values)
-    msf.ExcelSheetFill(results_file, 'C_reuse', building_mfa_system.FlowDict['Concrete reuse'].Values,
+    msf.ExcelSheetFill(results_file, 'C_reuse', scenario_result.aggregate('Concrete reuse', 'rot->rt'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_rec', building_mfa_system.FlowDict['Cement recycling'].Values[:, 0, :],
+    msf.ExcelSheetFill(results_file, 'C_rec', scenario_result.values('Cement recycling')[:, 0, :],
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
-    msf.ExcelSheetFill(results_file, 'C_was', building_mfa_system.FlowDict['Concrete landfill'].Values,
+    msf.ExcelSheetFill(results_file, 'C_was', scenario_result.values('Concrete landfill'),
                        rowlabels=building_mfa_system.IndexTable['Classification']['Region'].Items,
                        collabels=building_mfa_system.IndexTable['Classification']['Time'].Items)
     results_file.save(results_path + '/CE_midway.xls')
 
 
+def read_scenario_workers(script_config, building_mfa_system, scenario_selection, mylog):
+    scenario_workers = str(read_config_option(script_config, 'Scenario_Workers', 1)).strip().lower()
+    if scenario_workers == 'auto':
+        scenario_workers = os.cpu_count() or 1
+    scenario_workers = min(int(float(scenario_workers)), len(scenario_selection))
+    if scenario_workers <= 1:
+        return 1
+    scenario_bytes = 2 * sum(int(np.prod(mfa_object.Values.shape)) * mfa_object.Values.dtype.itemsize
+                             for mfa_object in list(building_mfa_system.FlowDict.values()) +
+                             list(building_mfa_system.StockDict.values()))
+    if isinstance(building_mfa_system.ParameterDict, LazyParameterDict):
+        scenario_bytes += max(building_mfa_system.ParameterDict.unloaded_bytes(
+            scenario_parameter_names(SCENARIO_DEFINITIONS[scenario_name],
+                                     scenario_flow_keys(SCENARIO_DEFINITIONS[scenario_name])))
+            for scenario_name in scenario_selection)
+    available_bytes = available_memory()
+    if available_bytes is not None and scenario_bytes > 0:
+        memory_workers = max(int(available_bytes // scenario_bytes), 1)
+        if memory_workers < scenario_workers:
+            mylog.warning('Number of scenario workers reduced from ' + str(scenario_workers) + ' to ' +
+                          str(memory_workers) + ' due to the available memory')
+            scenario_workers = memory_workers
+    return scenario_workers
+
+
+def available_memory():
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def parallel_scenario_calculation(building_mfa_system, results_path, mylog, scenario_selection, scenario_workers):
+    mylog.info('Calculate scenarios with ' + str(scenario_workers) + ' worker processes')
+    print('Calculate scenarios with ' + str(scenario_workers) + ' worker processes')
+    if 'fork' in multiprocessing.get_all_start_methods():
+        scenario_context = multiprocessing.get_context('fork')
+    else:
+        scenario_context = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=scenario_workers, mp_context=scenario_context,
+                             initializer=initialize_scenario_worker,
+                             initargs=(building_mfa_system, results_path, mylog)) as scenario_pool:
+        for scenario_name in scenario_pool.map(run_scenario, scenario_selection):
+            mylog.info('Scenario ' + scenario_name + ' finished')
+
+
+def initialize_scenario_worker(building_mfa_system, results_path, mylog):
+    SCENARIO_WORKER_STATE['building_mfa_system'] = building_mfa_system
+    SCENARIO_WORKER_STATE['results_path'] = results_path
+    SCENARIO_WORKER_STATE['mylog'] = mylog
+
+
+def run_scenario(scenario_name):
+    system_view = scenario_system_view(SCENARIO_WORKER_STATE['building_mfa_system'])
+    scenario_result = SCENARIO_SOLVERS[scenario_name](system_view, SCENARIO_WORKER_STATE['mylog'])
+    SCENARIO_WRITERS[scenario_name](system_view, scenario_result, SCENARIO_WORKER_STATE['results_path'],
+                                    SCENARIO_WORKER_STATE['mylog'])
+    return scenario_name
+
+
+def scenario_system_view(building_mfa_system):
+    system_view = copy(building_mfa_system)
+    system_view.FlowDict = {key: copy(flow) for key, flow in building_mfa_system.FlowDict.items()}
+    system_view.StockDict = {key: copy(stock) for key, stock in building_mfa_system.StockDict.items()}
+    return system_view
+
+
+def batched_scenario_calculation(building_mfa_system, results_path, mylog, scenario_selection):
+    scenario_results = solve_mfa_scenarios(building_mfa_system.ParameterDict, scenario_selection, mylog)
+    for scenario_name in scenario_selection:
+        SCENARIO_WRITERS[scenario_name](building_mfa_system, scenario_results[scenario_name], results_path, mylog)
+
+
+def streaming_scenario_calculation(data_path, results_path, index_table, index_table_classification_names,
+                                   master_classification, mylog, pl_index_layer, pl_index_match, pl_index_structure,
+                                   pl_names, pl_version, model_time_end, model_time_start, script_config,
+                                   memory_budget):
+    scenario_selection = read_scenario_selection(script_config, mylog)
+    read_chunk = partial(read_region_parameters, data_path=data_path, index_table=index_table,
+                         index_table_classification_names=index_table_classification_names,
+                         master_classification=master_classification, mylog=mylog, pl_index_layer=pl_index_layer,
+                         pl_index_match=pl_index_match, pl_index_structure=pl_index_structure, pl_names=pl_names,
+                         pl_version=pl_version, model_time_start=model_time_start, script_config=script_config)
+    configure_flow_cache(script_config, mylog)
+    configure_elementwise_backend(script_config, mylog)
+    region_count = len(index_table.Classification['Region'].Items)
+    chunk_parameters = read_chunk(0, 1)[1]
+    chunk_size = region_count
+    for scenario_name in scenario_selection:
+        node_values = {}
+        evaluate_flow_graph(chunk_parameters, SCENARIO_DEFINITIONS[scenario_name],
+                            scenario_flow_keys(SCENARIO_DEFINITIONS[scenario_name]), node_values)
+        chunk_size = min(chunk_size, sample_chunk_size(node_values, memory_budget, region_count))
+    mylog.info('Read parameters and solve scenarios in chunks of ' + str(chunk_size) + ' regions')
+    print('Read parameters and solve scenarios in chunks of ' + str(chunk_size) + ' regions')
+    flow_values = {scenario_name: {} for scenario_name in scenario_selection}
+    for region_start in range(0, region_count, chunk_size):
+        region_stop = min(region_start + chunk_size, region_count)
+        chunk_parameters = read_chunk(region_start, region_stop)[1]
+        for scenario_name in scenario_selection:
+            scenario_path = os.path.join(results_path, 'streaming', scenario_name)
+            os.makedirs(scenario_path, exist_ok=True)
+            chunk_flows = evaluate_sampled_flows(chunk_parameters, SCENARIO_DEFINITIONS[scenario_name],
+                                                 scenario_flow_keys(SCENARIO_DEFINITIONS[scenario_name]))
+            for key, values in chunk_flows.items():
+                values = dense_values(values)
+                if key not in flow_values[scenario_name]:
+                    flow_shape = (region_count,) + values.shape[1:] if regional_flow(key) else values.shape
+                    flow_values[scenario_name][key] = np.lib.format.open_memmap(
+                        os.path.join(scenario_path, flow_file_name(key)), mode='w+', dtype=values.dtype,
+                        shape=flow_shape)
+                if regional_flow(key):
+                    flow_values[scenario_name][key][region_start:region_stop] = values
+                else:
+                    flow_values[scenario_name][key] += values
+    building_mfa_system = define_mfa_system(index_table, model_time_end, model_time_start, {}, mylog)
+    for scenario_name in scenario_selection:
+        for values in flow_values[scenario_name].values():
+            values.flush()
+        SCENARIO_WRITERS[scenario_name](building_mfa_system,
+                                        ScenarioResult(scenario_name, flow_values[scenario_name]), results_path,
+                                        mylog)
+    return building_mfa_system
+
+
+def read_region_parameters(region_start, region_stop, data_path, index_table, index_table_classification_names,
+                           master_classification, mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names,
+                           pl_version, model_time_start, script_config):
+    region_index_table = region_shard_index_table(index_table, region_start, region_stop)
+    parameter_dict = read_data_and_parameters(data_path, index_table, index_table_classification_names,
+                                              master_classification, mylog, pl_index_layer, pl_index_match,
+                                              pl_index_structure, pl_names, pl_version, script_config,
+                                              (region_start, region_stop))
+    stock_model = read_stock_model(script_config, mylog)
+    if stock_model != 'exogenous':
+        solve_dynamic_building_stock(parameter_dict, region_index_table, model_time_start, script_config, stock_model,
+                                     mylog)
+    return region_index_table, parameter_dict
+
+
+def regional_flow(flow_key):
+    return not FLOW_GRAPH[flow_key].get('subscripts', '').endswith('->...bt')
+
+
+def flow_file_name(flow_key):
+    return re.sub(r'\W+', '_', flow_key) + '.npy'
+
+
+def sharded_scenario_calculation(data_path, results_path, index_table, index_table_classification_names,
+                                 master_classification, mylog, pl_index_layer, pl_index_match, pl_index_structure,
+                                 pl_names, pl_version, pr_l_name, pr_l_number, model_time_end, model_time_start,
+                                 script_config, shard_count):
+    EINSUM_PLAIN_LOOP['enabled'] = True
+    shard_path = read_config_option(script_config, 'Region_Shard_Path', os.path.join(results_path, 'shards'))
+    shard_selection = str(read_config_option(script_config, 'Region_Shard', 'all')).strip().lower()
+    run_shard = partial(run_region_shard, shard_count=shard_count, shard_path=shard_path, data_path=data_path,
+                        index_table=index_table, index_table_classification_names=index_table_classification_names,
+                        master_classification=master_classification, mylog=mylog, pl_index_layer=pl_index_layer,
+                        pl_index_match=pl_index_match, pl_index_structure=pl_index_structure, pl_names=pl_names,
+                        pl_version=pl_version, pr_l_name=pr_l_name, pr_l_number=pr_l_number,
+                        model_time_end=model_time_end, model_time_start=model_time_start,
+                        script_config=script_config)
+    if shard_selection == 'all':
+        shard_workers = int(read_config_option(script_config, 'Region_Shard_Workers',
+                                               min(shard_count, os.cpu_count() or 1)))
+        launch_region_shards(run_shard, shard_count, shard_workers, mylog)
+    elif shard_selection != 'merge':
+        run_shard(int(shard_selection))
+        return None
+    return merge_region_shards(shard_path, results_path, index_table, model_time_end, model_time_start,
+                               read_scenario_selection(script_config, mylog), shard_count, mylog)
+
+
+def launch_region_shards(run_shard, shard_count, shard_workers, mylog):
+    mylog.info('Solve ' + str(shard_count) + ' region shards with ' + str(shard_workers) + ' worker processes')
+    print('Solve ' + str(shard_count) + ' region shards with ' + str(shard_workers) + ' worker processes')
+    if 'fork' in multiprocessing.get_all_start_methods():
+        shard_context = multiprocessing.get_context('fork')
+    else:
+        shard_context = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=shard_workers, mp_context=shard_context) as shard_pool:
+        for shard_index in shard_pool.map(run_shard, range(0, shard_count)):
+            mylog.info('Region shard ' + str(shard_index) + ' finished')
+
+
+def run_region_shard(shard_index, shard_count, shard_path, data_path, index_table, index_table_classification_names,
+                     master_classification, mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names,
+                     pl_version, pr_l_name, pr_l_number, model_time_end, model_time_start, script_config):
+    EINSUM_PLAIN_LOOP['enabled'] = True
+    region_start, region_stop = region_shard_bounds(len(index_table.Classification['Region'].Items), shard_count,
+                                                    shard_index)
+    mylog.info('Solve region shard ' + str(shard_index) + ' with regions ' + str(region_start) + ' to ' +
+               str(region_stop - 1))
+    print('Solve region shard ' + str(shard_index) + ' with regions ' + str(region_start) + ' to ' +
+          str(region_stop - 1))
+    shard_index_table, parameter_dict = read_region_parameters(
+        region_start, region_stop, data_path, index_table, index_table_classification_names, master_classification,
+        mylog, pl_index_layer, pl_index_match, pl_index_structure, pl_names, pl_version, model_time_start,
+        script_config)
+    building_mfa_system = define_mfa_system(shard_index_table, model_time_end, model_time_start, parameter_dict,
+                                            mylog)
+    add_processes_mfa(building_mfa_system, pr_l_name, pr_l_number, mylog)
+    add_flows_mfa(building_mfa_system, mylog)
+    add_stocks_mfa(building_mfa_system, mylog)
+    model_dtype = read_model_precision(script_config, mylog)
+    lazy_values = read_config_flag(script_config, 'Lazy_Flow_Values', False)
+    initialize_flow_values(building_mfa_system, model_dtype, lazy_values)
+    initialize_stock_values(building_mfa_system, model_dtype, lazy_values)
+    configure_flow_cache(script_config, mylog)
+    configure_elementwise_backend(script_config, mylog)
+    configure_flow_buffer_arena(script_config, mylog)
+    for scenario_name in read_scenario_selection(script_config, mylog):
+        scenario_result = solve_flow_graph(building_mfa_system, scenario_name,
+                                           region_shard_flow_keys(SCENARIO_DEFINITIONS[scenario_name]))
+        scenario_path = os.path.join(shard_path, scenario_name, 'shard_' + str(shard_index))
+        os.makedirs(scenario_path, exist_ok=True)
+        for key in scenario_result.keys():
+            np.save(os.path.join(scenario_path, flow_file_name(key)), dense_values(scenario_result.values(key)))
+        with open(os.path.join(scenario_path, 'shard.json'), 'w') as shard_file:
+            json.dump({'regions': [str(item) for item in shard_index_table.Classification['Region'].Items],
+                       'flows': list(scenario_result.keys())}, shard_file, indent=1)
+    return shard_index
+
+
+def region_shard_bounds(region_count, shard_count, shard_index):
+    return shard_index * region_count // shard_count, (shard_index + 1) * region_count // shard_count
+
+
+def region_shard_index_table(index_table, region_start, region_stop):
+    shard_index_table = index_table.copy()
+    region_classification = copy(index_table.Classification['Region'])
+    region_classification.Items = region_classification.Items[region_start:region_stop]
+    shard_index_table.at['Region', 'Classification'] = region_classification
+    shard_index_table.at['Region', 'IndexSize'] = region_stop - region_start
+    return shard_index_table
+
+
+def region_shard_flow_keys(scenario_definition):
+    flow_keys = []
+    for key in scenario_flow_keys(scenario_definition):
+        flow_keys += [key] if regional_flow(key) else flow_node_inputs(FLOW_GRAPH[key])
+    return flow_keys
+
+
+def merge_region_shards(shard_path, results_path, index_table, model_time_end, model_time_start, scenario_selection,
+                        shard_count, mylog):
+    mylog.info('Merge results of ' + str(shard_count) + ' region shards')
+    print('Merge results of ' + str(shard_count) + ' region shards')
+    building_mfa_system = define_mfa_system(index_table, model_time_end, model_time_start, {}, mylog)
+    region_items = [str(item) for item in index_table.Classification['Region'].Items]
+    for scenario_name in scenario_selection:
+        scenario_definition = SCENARIO_DEFINITIONS[scenario_name]
+        shard_regions = []
+        shard_flows = []
+        for shard_index in range(0, shard_count):
+            scenario_path = os.path.join(shard_path, scenario_name, 'shard_' + str(shard_index))
+            with open(os.path.join(scenario_path, 'shard.json')) as shard_file:
+                shard_info = json.load(shard_file)
+            shard_regions += shard_info['regions']
+            shard_flows.append({key: np.load(os.path.join(scenario_path, flow_file_name(key)), mmap_mode='r')
+                                for key in shard_info['flows']})
+        if shard_regions != region_items:
+            mylog.error('REGION SHARD ERROR: The shards of scenario ' + scenario_name +
+                        ' do not match the Region classification of the model.')
+            raise ValueError('Region shards of scenario ' + scenario_name + ' do not match the Region classification')
+        flow_values = {key: np.concatenate([flows[key] for flows in shard_flows]) for key in shard_flows[0]}
+        for key in scenario_flow_keys(scenario_definition):
+            if key not in flow_values:
+                flow_values[key] = evaluate_flow_node(FLOW_GRAPH[key], flow_values, {}, scenario_definition)
+        SCENARIO_WRITERS[scenario_name](building_mfa_system,
+                                        ScenarioResult(scenario_name,
+                                                       {key: flow_values[key] for key in
+                                                        scenario_flow_keys(scenario_definition)
+                                                        if flow_values.get(key) is not None}),
+                                        results_path, mylog)
+    return building_mfa_system
+
+
+def scenario_parameter_name(par_name, scenario_definition, mechanism):
+    if mechanism is None:
+        return par_name
+    if mechanism not in scenario_definition:
+        return None
+    return par_name + scenario_definition[mechanism]
+
+
+def stack_scenario_parameters(parameter_dict, scenario_definitions, par_name, mechanism):
+    scenario_par_names = [scenario_parameter_name(par_name, scenario_definition, mechanism)
+                          for scenario_definition in scenario_definitions]
+    present_values = dense_values(parameter_dict[next(scenario_par_name for scenario_par_name in scenario_par_names
+                                                       if scenario_par_name is not None)].Values)
+    return np.stack([np.zeros_like(present_values) if scenario_par_name is None else
+                     dense_values(parameter_dict[scenario_par_name].Values)
+                     for scenario_par_name in scenario_par_names])
+
+
+def flow_graph_conditions():
+    conditions = set(flow_node['condition'] for flow_node in FLOW_GRAPH.values() if 'condition' in flow_node)
+    for flow_node in FLOW_GRAPH.values():
+        conditions.update(term[3] for term in flow_node.get('terms', []) if term[3] is not None)
+    return sorted(conditions)
+
+
+def solve_mfa_scenarios(parameter_dict, scenario_selection, mylog):
+    mylog.info('Solve MFA for all selected scenarios in one batch')
+    print('Solve MFA for all selected scenarios in one batch')
+    conditions = flow_graph_conditions()
+    scenario_groups = OrderedDict()
+    for scenario_name in scenario_selection:
+        scenario_flags = tuple(bool(SCENARIO_DEFINITIONS[scenario_name].get(condition, False))
+                               for condition in conditions)
+        scenario_groups.setdefault(scenario_flags, []).append(scenario_name)
+    scenario_results = {}
+    for scenario_flags, group_selection in scenario_groups.items():
+        definitions = [SCENARIO_DEFINITIONS[scenario_name] for scenario_name in group_selection]
+        requested_flows = list(dict.fromkeys(key for scenario_definition in definitions
+                                             for key in scenario_flow_keys(scenario_definition)))
+        batched_definition = dict(zip(conditions, scenario_flags))
+        batched_parameters = {}
+        for node in flow_graph_order(requested_flows):
+            flow_node = FLOW_GRAPH[node]
+            if 'parameter' not in flow_node:
+                continue
+            if 'mechanism' not in flow_node:
+                batched_parameters[flow_node['parameter']] = parameter_dict[flow_node['parameter']]
+            elif any(flow_node['mechanism'] in scenario_definition for scenario_definition in definitions):
+                batched_definition[flow_node['mechanism']] = ''
+                batched_parameters[flow_node['parameter']] = SampledParameter(
+                    stack_scenario_parameters(parameter_dict, definitions, flow_node['parameter'],
+                                              flow_node['mechanism']))
+        flow_values = evaluate_sampled_flows(batched_parameters, batched_definition, requested_flows)
+        for sc in range(0, len(group_selection)):
+            scenario_results[group_selection[sc]] = ScenarioResult(
+                group_selection[sc], {key: flow_values[key][sc] for key in scenario_flow_keys(definitions[sc])})
+    return {scenario_name: scenario_results[scenario_name] for scenario_name in scenario_selection}
+
+
+SCENARIO_SOLVERS = {'reference': solve_mfa_reference,
+                    'timber_construction': solve_mfa_timber_construction,
+                    'reduced_space': solve_mfa_reduced_space,
+                    'reduced_overspec': solve_mfa_reduced_overspec,
+                    'cult_herit': solve_mfa_cult_herit,
+                    'renovation': solve_mfa_renovation,
+                    'reuse_elements': solve_mfa_reuse_elements,
+                    'reuse_steel': solve_mfa_reuse_steel,
+                    'rec_cement': solve_mfa_rec_cement,
+                    'bundle_lifestyle': solve_mfa_bundle_lifestyle,
+                    'bundle_construction': solve_mfa_bundle_construction,
+                    'bundle_midway': solve_mfa_bundle_midway}
+
+
+SCENARIO_WRITERS = {'reference': write_results_excel_reference,
+                    'timber_construction': write_results_excel_timber_construction,
+                    'reduced_space': write_results_excel_reduced_space,
+                    'reduced_overspec': write_results_excel_reduced_overspec,
+                    'cult_herit': write_results_excel_cult_herit,
+                    'renovation': write_results_excel_renovation,
+                    'reuse_elements': write_results_excel_reuse_elements,
+                    'reuse_steel': write_results_excel_reuse_steel,
+                    'rec_cement': write_results_excel_rec_cement,
+                    'bundle_lifestyle': write_results_excel_bundle_lifestyle,
+                    'bundle_construction': write_results_excel_bundle_construction,
+                    'bundle_midway': write_results_excel_bundle_midway}
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from odym.modules import ODYM_Classes as msc
+
+import building_model as bm
+
+MYLOG = logging.getLogger('test_flow_graph')
+MODEL_TIME_START = 2020
+MODEL_TIME_END = 2025
+INDEX_ITEMS = [('Time', 't', list(range(MODEL_TIME_START, MODEL_TIME_END + 1))),
+               ('Element', 'e', ['All']),
+               ('Region', 'r', ['AT', 'BE', 'CZ']),
+               ('BuildingType', 'b', ['SFH', 'MFH']),
+               ('AgeCohort', 'a', ['1950-1979', '1980-2019', '2020-2050']),
+               ('FinishedProduct', 'f', ['Rebar', 'Section']),
+               ('Steel', 's', ['BOF', 'EAF']),
+               ('Clinker', 'l', ['Clinker']),
+               ('Cement', 'm', ['Cement']),
+               ('ConcreteProduct', 'o', ['Ready-mix', 'Precast'])]
+BUILDING_VARIANTS = ['', '_reduced', '_cult', '_renov', '_lifestyle', '_midway']
+MI_VARIANTS = ['', '_timber', '_overspec', '_lifestyle', '_construction', '_midway']
+PARAMETER_INDICES = dict(
+    [(par_name + variant, 'rbat') for variant in BUILDING_VARIANTS
+     for par_name in ('par_building_inflow', 'par_building_stock', 'par_building_outflow')] +
+    [(par_name + variant, par_indices) for variant in MI_VARIANTS
+     for par_name, par_indices in (('par_mi_steel', 'rbaf'), ('par_mi_concrete', 'rbao'))] +
+    [('par_steel_process', 'rfst'), ('par_finished_losses', 'rft'), ('par_steel_recycling', 'rst'),
+     ('par_steel_losses', 'rst'), ('par_cement_process', 'romt'), ('par_concrete_losses', 'rot'),
+     ('par_clinker_process', 'rmlt'), ('par_cement_losses', 'rmt'), ('par_concrete_reuse', 'rot')] +
+    [(par_name + variant, par_indices) for variant in ('', '_midway')
+     for par_name, par_indices in (('par_steel_element_reuse', 'rft'), ('par_concrete_element_reuse', 'rot'),
+                                   ('par_steel_reuse', 'rft'), ('par_cement_recycling', 'rot'))])
+CONFIGURATIONS = [{},
+                  {'Sparse_Parameters': 'True'},
+                  {'Flow_Buffer_Arena': 'True'},
+                  {'Elementwise_Backend': 'numexpr'},
+                  {'Lazy_Flow_Values': 'True'},
+                  {'Model_Precision': 'float32'}]
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flow_graph_reference.json')) as reference_file:
+    REFERENCE_TOTALS = json.load(reference_file)
+
+
+def synthetic_index_table():
+    index_table = pd.DataFrame({'Aspect': [aspect for aspect, index_letter, items in INDEX_ITEMS],
+                                'Description': '',
+                                'Dimension': '',
+                                'Classification': [msc.Classification(Name=aspect, Items=items)
+                                                   for aspect, index_letter, items in INDEX_ITEMS],
+                                'IndexLetter': [index_letter for aspect, index_letter, items in INDEX_ITEMS]})
+    index_table.set_index('Aspect', inplace=True)
+    index_table['IndexSize'] = [len(items) for aspect, index_letter, items in INDEX_ITEMS]
+    return index_table
+
+
+def synthetic_parameters(sparse=False, dtype=np.float64):
+    index_sizes = {index_letter: len(items) for aspect, index_letter, items in INDEX_ITEMS}
+    rng = np.random.default_rng(2022)
+    parameter_dict = {}
+    for par_name, par_indices in PARAMETER_INDICES.items():
+        values = rng.random([index_sizes[index_letter] for index_letter in par_indices])
+        if par_indices.startswith('rba'):
+            values[values < 0.3] = 0
+        if par_name.startswith('par_building_outflow'):
+            values = -values
+        meta_data = {'Dataset_Name': par_name, 'Dataset_ID': None, 'Dataset_UUID': None, 'Dataset_Unit': None}
+        parameter_dict[par_name] = bm.define_parameter(meta_data, values, par_indices,
+                                                       sparse and par_indices.startswith('rba'), dtype)
+    return parameter_dict
+
+
+def synthetic_system(parameter_dict, dtype=np.float64, lazy_values=False):
+    building_mfa_system = bm.define_mfa_system(synthetic_index_table(), MODEL_TIME_END, MODEL_TIME_START,
+                                               parameter_dict, MYLOG)
+    bm.add_processes_mfa(building_mfa_system, ['Process ' + str(m) for m in range(0, 11)], list(range(0, 11)), MYLOG)
+    bm.add_flows_mfa(building_mfa_system, MYLOG)
+    bm.add_stocks_mfa(building_mfa_system, MYLOG)
+    bm.initialize_flow_values(building_mfa_system, dtype, lazy_values)
+    bm.initialize_stock_values(building_mfa_system, dtype, lazy_values)
+    return building_mfa_system
+
+
+def configure_model(script_config):
+    bm.configure_flow_cache(script_config, MYLOG)
+    bm.configure_elementwise_backend(script_config, MYLOG)
+    bm.configure_flow_buffer_arena(script_config, MYLOG)
+    bm.configure_incremental_recompute(script_config, MYLOG)
+
+
+def flow_totals(values):
+    values = np.asarray(bm.dense_values(values), dtype=np.float64)
+    return values.reshape(-1, values.shape[-1]).sum(axis=0)
+
+
+def check_scenario_totals(scenario_name, scenario_result, rtol, atol):
+    assert sorted(REFERENCE_TOTALS[scenario_name]) == \
+        sorted(key for key in scenario_result.keys() if key in REFERENCE_TOTALS[scenario_name])
+    for key, reference_totals in REFERENCE_TOTALS[scenario_name].items():
+        np.testing.assert_allclose(flow_totals(scenario_result.values(key)), reference_totals, rtol=rtol,
+                                   atol=atol, err_msg=scenario_name + ': ' + key)
+
+
+@pytest.mark.parametrize('script_config', CONFIGURATIONS, ids=lambda script_config: str(script_config))
+@pytest.mark.parametrize('scenario_name', bm.SCENARIO_NAMES)
+def test_scenario_flows(scenario_name, script_config):
+    configure_model(script_config)
+    dtype = bm.read_model_precision(script_config, MYLOG)
+    parameter_dict = synthetic_parameters('Sparse_Parameters' in script_config, dtype)
+    building_mfa_system = synthetic_system(parameter_dict, dtype,
+                                           bm.read_config_flag(script_config, 'Lazy_Flow_Values', False))
+    scenario_result = bm.solve_flow_graph(building_mfa_system, scenario_name)
+    if dtype == np.float32:
+        check_scenario_totals(scenario_name, scenario_result, 1e-5, 1e-6)
+    else:
+        check_scenario_totals(scenario_name, scenario_result, 1e-12, 1e-12)
+
+
+def test_batched_scenarios():
+    configure_model({})
+    scenario_results = bm.solve_mfa_scenarios(synthetic_parameters(), bm.SCENARIO_NAMES, MYLOG)
+    for scenario_name in bm.SCENARIO_NAMES:
+        check_scenario_totals(scenario_name, scenario_results[scenario_name], 1e-12, 1e-12)
+
+
+@pytest.mark.parametrize('stock_model', ['inflow_driven', 'stock_driven'])
+def test_dynamic_stock_balance(stock_model):
+    parameter_dict = synthetic_parameters()
+    exogenous_stock = bm.dense_values(parameter_dict['par_building_stock'].Values).copy()
+    exogenous_inflow = bm.dense_values(parameter_dict['par_building_inflow'].Values).copy()
+    initial_stock = exogenous_stock[..., 0] - exogenous_inflow[..., 0] - \
+        bm.dense_values(parameter_dict['par_building_outflow'].Values)[..., 0]
+    bm.solve_dynamic_building_stock(parameter_dict, synthetic_index_table(), MODEL_TIME_START, {}, stock_model, MYLOG)
+    building_inflow = bm.dense_values(parameter_dict['par_building_inflow'].Values)
+    building_stock = bm.dense_values(parameter_dict['par_building_stock'].Values)
+    building_outflow = bm.dense_values(parameter_dict['par_building_outflow'].Values)
+    previous_stock = np.concatenate((initial_stock[..., np.newaxis], building_stock[..., :-1]), axis=-1)
+    np.testing.assert_allclose(building_stock - previous_stock, building_inflow + building_outflow, atol=1e-12)
+    if stock_model == 'inflow_driven':
+        np.testing.assert_array_equal(building_inflow, exogenous_inflow)
+    else:
+        np.testing.assert_allclose(building_stock.sum(axis=2), exogenous_stock.sum(axis=2), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('scenario_name', ['reference', 'reuse_elements', 'bundle_midway'])
+def test_activity_response(scenario_name):
+    configure_model({})
+    building_mfa_system = synthetic_system(synthetic_parameters())
+    flow_operators = bm.flow_operators(building_mfa_system, scenario_name, mylog=MYLOG)
+    activity_values = {activity: np.array(bm.dense_values(values))
+                       for activity, values in flow_operators.activity_values.items()}
+    activity_values['Construction of buildings'][:, 1] *= 1.3
+    activity_values['Demolition of buildings'][:, :, 2] *= 0.5
+    scenario_definition = bm.SCENARIO_DEFINITIONS[scenario_name]
+    sampled_parameters = dict(building_mfa_system.ParameterDict)
+    for activity, values in activity_values.items():
+        sampled_parameters[bm.scenario_parameter_name(bm.FLOW_GRAPH[activity]['parameter'], scenario_definition,
+                                                      'buildings')] = bm.SampledParameter(values)
+    flow_values = bm.evaluate_sampled_flows(sampled_parameters, scenario_definition,
+                                            list(flow_operators.flow_values))
+    for key in flow_operators.flow_values:
+        np.testing.assert_allclose(flow_operators.activity_response(key, activity_values),
+                                   bm.dense_values(flow_values[key]), rtol=1e-10, atol=1e-12, err_msg=key)
@@ -0,0 +1,29 @@
+import numpy as np
+
+import building_model as bm
+
+
+def test_sobol_indices_linear_function():
+    design = bm.saltelli_design(2, 4096, np.random.default_rng(2022))
+    outputs = (100 + design[:, 0] + 2 * design[:, 1])[:, np.newaxis]
+    indices = bm.sobol_indices(outputs, 2)
+    np.testing.assert_allclose(indices['S1'][:, 0], [0.2, 0.8], atol=0.03)
+    np.testing.assert_allclose(indices['ST'][:, 0], [0.2, 0.8], atol=0.03)
+
+
+def test_sobol_indices_ishigami_function():
+    design = bm.saltelli_design(3, 8192, np.random.default_rng(2022))
+    factors = np.pi * (2 * design - 1)
+    outputs = (np.sin(factors[:, 0]) + 7 * np.sin(factors[:, 1]) ** 2 +
+               0.1 * factors[:, 2] ** 4 * np.sin(factors[:, 0]))[:, np.newaxis]
+    indices = bm.sobol_indices(outputs, 3)
+    np.testing.assert_allclose(indices['S1'][:, 0], [0.3139, 0.4424, 0.0], atol=0.03)
+    np.testing.assert_allclose(indices['ST'][:, 0], [0.5576, 0.4424, 0.2437], atol=0.03)
+
+
+def test_morris_indices_linear_function():
+    design, factor_order = bm.morris_design(2, 20, np.random.default_rng(2022))
+    outputs = (100 + design[:, 0] + 2 * design[:, 1])[:, np.newaxis]
+    indices = bm.morris_indices(outputs, design, factor_order)
+    np.testing.assert_allclose(indices['mu_star'][:, 0], [1, 2])
+    np.testing.assert_allclose(indices['sigma'][:, 0], [0, 0], atol=1e-12)